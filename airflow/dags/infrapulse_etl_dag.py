@@ -4,88 +4,148 @@ from airflow.operators.python import PythonOperator
 from datetime import datetime
 import sys
 import os
-import psycopg2
 
 # Add parent directory to path so we can import ETL modules
 # ETL modules are in /opt/airflow/ (same level as dags/)
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from extract import extract_failures
-from transform import transform_failures
-from quality_checks import check_null_asset, check_negative_outage
-from load import load_failures
+from db import connection
+from metrics import StageMetrics, record_stage_metrics, write_textfile
+from manifest import pending_files
+from pipeline import find_staged_files
+from artifacts import load_stage, run_dir, run_stage, sweep_artifacts, write_files
+from staging import convert_staging_dir
+from ingest import ingest_raw_dir
 from elt_logger import log_info, log_error
 
-def run_etl():
-    # Use flexible path that works in both local and Astronomer environments
+def ingest_files():
+    """Move settled raw exports into staging; per-file results go to XCom"""
     base_dir = os.getenv("AIRFLOW_DATA_DIR", "/opt/airflow/data")
-    file_path = os.path.join(base_dir, "staging", "failures.csv")
-    
-    # Log the path being used
-    log_info(f"Using data file: {file_path}")
-
-    # Skip ETL if file doesn't exist (useful for Astronomer deployments without data volume)
-    if not os.path.exists(file_path):
-        log_info(f"Data file not found at {file_path}. Skipping ETL (normal for test deployments).")
-        return
+    results = ingest_raw_dir(os.path.join(base_dir, "raw"), os.path.join(base_dir, "staging"))
+    return [result._asdict() for result in results]
 
-    df = extract_failures(file_path)
-    df = transform_failures(df)
+def stage_parquet():
+    """Convert staged CSVs to Parquet once, so retries skip CSV parsing"""
+    base_dir = os.getenv("AIRFLOW_DATA_DIR", "/opt/airflow/data")
+    convert_staging_dir(os.path.join(base_dir, "staging"))
 
-    if check_null_asset(df) > 0:
-        raise ValueError("Null asset IDs found")
+def _artifact_dir(run_id):
+    base_dir = os.getenv("AIRFLOW_DATA_DIR", "/opt/airflow/data")
+    return run_dir(base_dir, run_id)
 
-    if check_negative_outage(df) > 0:
-        raise ValueError("Negative outage values found")
+def extract_files(run_id=None):
+    """Pick the staged files this run loads and extract them to Parquet"""
+    # Use flexible path that works in both local and Astronomer environments
+    base_dir = os.getenv("AIRFLOW_DATA_DIR", "/opt/airflow/data")
+    staging_dir = os.path.join(base_dir, "staging")
+    file_paths = find_staged_files(staging_dir)
+
+    # Log the files being used
+    log_info("Using %s staged data files from %s", len(file_paths), staging_dir)
+
+    # Skip ETL if there is nothing staged (useful for Astronomer deployments without data volume)
+    if not file_paths:
+        log_info("No staged data files in %s. Skipping ETL (normal for test deployments).", staging_dir)
+
+    directory = _artifact_dir(run_id)
+    sweep_artifacts(base_dir, keep=directory)
+    write_files(directory, pending_files(file_paths))
+    run_stage(directory, "extract")
+
+def transform_files(run_id=None):
+    run_stage(_artifact_dir(run_id), "transform")
+
+def validate_files(run_id=None):
+    run_stage(_artifact_dir(run_id), "validate")
+
+def load_files(run_id=None):
+    # Batch ids (etl_metadata.run_id) go to XCom for downstream tasks
+    return [result.batch_id for result in load_stage(_artifact_dir(run_id))]
+
+# Every integrity counter in one pass; the LEFT JOIN is the orphan anti-join
+FACT_COUNTERS_SQL = """
+    SELECT
+      COUNT(*),
+      COUNT(*) FILTER (WHERE f.asset_key IS NULL),
+      COUNT(*) FILTER (WHERE f.outage_minutes < 0),
+      COUNT(*) FILTER (WHERE f.asset_key IS NOT NULL AND a.asset_key IS NULL)
+    FROM fact_service_failure f {sample}
+    LEFT JOIN dim_asset a ON a.asset_key = f.asset_key
+    {where}
+"""
+
+# Optional audit of a random sample of the whole fact table
+VERIFY_FULL_AUDIT = os.getenv("VERIFY_FULL_AUDIT", "false").lower() == "true"
+VERIFY_AUDIT_SAMPLE_PERCENT = float(os.getenv("VERIFY_AUDIT_SAMPLE_PERCENT", 1))
+
+def check_fact_counters(cur, scope, sample="", where="", params=()):
+    """Run FACT_COUNTERS_SQL and raise if any integrity counter is non-zero"""
+    cur.execute(FACT_COUNTERS_SQL.format(sample=sample, where=where), params)
+    record_count, null_assets, negative_outages, orphaned = cur.fetchone()
+    log_info(
+        "%s: %s records, %s null asset_key, "
+        "%s negative outage_minutes, %s orphaned",
+        scope, record_count, null_assets, negative_outages, orphaned
+    )
+    if null_assets > 0:
+        raise ValueError(f"Found {null_assets} records with null asset_key")
+    if negative_outages > 0:
+        raise ValueError(f"Found {negative_outages} records with negative outage_minutes")
+    if orphaned > 0:
+        raise ValueError(f"Found {orphaned} orphaned fact records")
+    return record_count
+
+def verify_data(run_id=None):
+    """Verify the batches this DAG run loaded into PostgreSQL (cloud-ready)
+
+    Only fact rows whose batch_id belongs to this run are scanned. Set
+    VERIFY_FULL_AUDIT=true to also check a TABLESAMPLE of the whole table.
+    """
+    metrics = StageMetrics()
+    
+    try:
+        with metrics.stage("verify") as stage:
+            with connection() as conn:
+                stage.rows_in = _verify_batches(conn, run_id)
+        log_info("✓ All data verification checks passed!")
+        
+    except Exception as e:
+        log_error("Data verification failed: %s", e)
+        raise
+    finally:
+        record_stage_metrics(metrics, dag_run_id=run_id)
+        write_textfile(metrics, "verify")
 
-    load_failures(df)
+def _verify_batches(conn, run_id):
+    """Run the verify_data checks on conn; raises ValueError on failure
 
-def verify_data():
-    """Verify data loaded into PostgreSQL (cloud-ready)"""
+    Returns the number of batch fact rows checked.
+    """
+    cur = conn.cursor()
     
-    try:
-        conn = psycopg2.connect(
-            host=os.getenv("POSTGRES_HOST", "postgres"),
-            port=int(os.getenv("POSTGRES_PORT", 5432)),
-            database=os.getenv("POSTGRES_DB", "railway"),
-            user=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD"),
-            sslmode=os.getenv("POSTGRES_SSL_MODE", "require"),  # Required for Railway
+    # Check 1: Batches loaded by this DAG run
+    cur.execute("""
+        SELECT run_id, records_loaded FROM etl_metadata
+        WHERE dag_run_id = %s AND status = 'SUCCESS'
+    """, (run_id,))
+    batches = dict(cur.fetchall())
+    expected = sum(batches.values())
+    log_info("Batches loaded by %s: %s (%s records)", run_id, sorted(batches), expected)
+    
+    record_count = 0
+    if batches:
+        batch_ids = list(batches)
+
+        # Check 2: Counts, null asset_key, negative outage_minutes and orphans for the batches
+        record_count = check_fact_counters(
+            cur, "Loaded batches", where="WHERE f.batch_id = ANY(%s)", params=(batch_ids,)
         )
-        cur = conn.cursor()
-        
-        # Check 1: Count records
-        cur.execute("SELECT COUNT(*) FROM fact_service_failure;")
-        record_count = cur.fetchone()[0]
-        log_info(f"Total records in fact_service_failure: {record_count}")
-        if record_count == 0:
-            raise ValueError("No records found in fact_service_failure table")
+        if record_count != expected:
+            raise ValueError(
+                f"Batches hold {record_count} fact records, etl_metadata expects {expected}"
+            )
         
-        # Check 2: Check for null asset_key
-        cur.execute("SELECT COUNT(*) FROM fact_service_failure WHERE asset_key IS NULL;")
-        null_assets = cur.fetchone()[0]
-        log_info(f"Null asset_key count: {null_assets}")
-        if null_assets > 0:
-            raise ValueError(f"Found {null_assets} records with null asset_key")
-        
-        # Check 3: Check for negative outage_minutes
-        cur.execute("SELECT COUNT(*) FROM fact_service_failure WHERE outage_minutes < 0;")
-        negative_outages = cur.fetchone()[0]
-        log_info(f"Negative outage_minutes count: {negative_outages}")
-        if negative_outages > 0:
-            raise ValueError(f"Found {negative_outages} records with negative outage_minutes")
-        
-        # Check 4: Verify assets exist in dim_asset
-        cur.execute("""
-            SELECT COUNT(*) FROM fact_service_failure f 
-            WHERE f.asset_key NOT IN (SELECT asset_key FROM dim_asset)
-        """)
-        orphaned = cur.fetchone()[0]
-        log_info(f"Orphaned fact records (no asset): {orphaned}")
-        if orphaned > 0:
-            raise ValueError(f"Found {orphaned} orphaned fact records")
-        
-        # Check 5: Get sample data
+        # Check 3: Get sample data
         cur.execute("""
             SELECT 
               fa.asset_id,
@@ -95,28 +155,34 @@ def verify_data():
             FROM fact_service_failure fd
             JOIN dim_asset fa ON fd.asset_key = fa.asset_key
             JOIN dim_date dd ON fd.date_key = dd.date_key
+            WHERE fd.batch_id = ANY(%s)
             LIMIT 3
-        """)
+        """, (batch_ids,))
         samples = cur.fetchall()
         log_info("Sample data:")
         for row in samples:
-            log_info(f"  Asset: {row[0]}, Date: {row[1]}, Type: {row[2]}, Outage: {row[3]} min")
-        
-        # Check 6: ETL metadata status
-        cur.execute("""
-            SELECT COUNT(*), SUM(records_loaded), MAX(status) 
-            FROM etl_metadata 
-            WHERE status = 'SUCCESS'
-        """)
-        result = cur.fetchone()
-        log_info(f"Successful ETL runs: {result[0]}, Total records loaded: {result[1]}")
-        
-        conn.close()
-        log_info("✓ All data verification checks passed!")
-        
-    except Exception as e:
-        log_error(f"Data verification failed: {str(e)}")
-        raise
+            log_info("  Asset: %s, Date: %s, Type: %s, Outage: %s min", row[0], row[1], row[2], row[3])
+    else:
+        log_info("No batches loaded by this run; skipping batch checks")
+    
+    # Check 4: Optional sampled audit of the whole fact table
+    if VERIFY_FULL_AUDIT:
+        check_fact_counters(
+            cur,
+            f"Full audit ({VERIFY_AUDIT_SAMPLE_PERCENT}% sample)",
+            sample="TABLESAMPLE SYSTEM (%s)",
+            params=(VERIFY_AUDIT_SAMPLE_PERCENT,),
+        )
+    
+    # Check 5: ETL metadata status
+    cur.execute("""
+        SELECT COUNT(*), SUM(records_loaded), MAX(status) 
+        FROM etl_metadata 
+        WHERE status = 'SUCCESS'
+    """)
+    result = cur.fetchone()
+    log_info("Successful ETL runs: %s, Total records loaded: %s", result[0], result[1])
+    return record_count
 
 default_args = {
     "owner": "data_engineer",
@@ -131,40 +197,38 @@ with DAG(
     default_args=default_args
 ) as dag:
 
-    ingest = BashOperator(
+    # Renames / hardlinks instead of copying, and leaves files that are
+    # still being written in raw for the next run
+    ingest = PythonOperator(
         task_id="ingest_files",
-        bash_command="""
-        set +e
-        BASE_DIR="${AIRFLOW_DATA_DIR:-/opt/airflow/data}"
-        STAGING_DIR="$BASE_DIR/staging"
-        RAW_DIR="$BASE_DIR/raw"
-        
-        # Try to create directories, but don't fail if we can't
-        mkdir -p "$STAGING_DIR" "$BASE_DIR/archive" 2>/dev/null
-        
-        # Check if raw directory exists and has files
-        if [ -d "$RAW_DIR" ] && [ "$(ls -A "$RAW_DIR" 2>/dev/null)" ]; then
-            echo "📂 Found raw data directory: $RAW_DIR"
-            # Copy all files from raw subdirectories to staging
-            find "$RAW_DIR" -maxdepth 2 -type f -name "*.csv" -exec cp {} "$STAGING_DIR/" \\; 2>/dev/null || true
-            if [ "$(ls -A "$STAGING_DIR" 2>/dev/null)" ]; then
-                FILE_COUNT=$(ls "$STAGING_DIR" | wc -l)
-                echo "✅ Files ingested successfully: $FILE_COUNT files"
-            else
-                echo "ℹ️  No CSV files found in raw directory"
-            fi
-        else
-            echo "ℹ️  No raw data directory found at: $RAW_DIR"
-            echo "ℹ️  This is normal for Astronomer deployments without persistent data volumes"
-        fi
-        exit 0
-        """,
-        do_xcom_push=False
+        python_callable=ingest_files
+    )
+
+    stage = PythonOperator(
+        task_id="stage_parquet",
+        python_callable=stage_parquet
+    )
+
+    # Stages hand off through Parquet files in the data dir, not XCom,
+    # so a retry only redoes the stage that failed
+    extract = PythonOperator(
+        task_id="extract_files",
+        python_callable=extract_files
+    )
+
+    transform = PythonOperator(
+        task_id="transform_files",
+        python_callable=transform_files
+    )
+
+    validate = PythonOperator(
+        task_id="validate_files",
+        python_callable=validate_files
     )
 
-    etl = PythonOperator(
-        task_id="run_etl",
-        python_callable=run_etl
+    load = PythonOperator(
+        task_id="load_files",
+        python_callable=load_files
     )
 
     archive = BashOperator(
@@ -183,4 +247,4 @@ with DAG(
         python_callable=verify_data
     )
 
-    ingest >> etl >> archive >> verify
+    ingest >> stage >> extract >> transform >> validate >> load >> archive >> verify
@@ -1,4 +1,10 @@
+import atexit
 import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 
 # Use Airflow's built-in logging (no need to create /opt/airflow/logs)
 logger = logging.getLogger(__name__)
@@ -7,8 +13,107 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-def log_info(msg):
-    logging.info(msg)
+# Minimum seconds between two lines from the same Progress
+PROGRESS_INTERVAL_SECONDS = float(os.getenv("ETL_PROGRESS_INTERVAL_SECONDS", 10))
 
-def log_error(msg):
-    logging.error(msg)
+
+class _ToRoot(logging.Handler):
+    """Runs on the listener thread and hands records to the root handlers
+
+    They are looked up per record, so handlers Airflow installs after
+    import still receive them.
+    """
+
+    def emit(self, record):
+        logging.getLogger().handle(record)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Enqueues records untouched; formatting happens on the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+    def close(self):
+        # logging.shutdown() (Airflow calls it before a task process exits)
+        # ends up here: write out whatever is still queued first
+        _stop_listener()
+        super().close()
+
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = _LazyQueueHandler(None)
+
+
+def _start_listener():
+    global _listener
+    records = queue.SimpleQueue()
+    _queue_handler.queue = records
+    _listener = QueueListener(records, _ToRoot())
+    _listener.start()
+
+
+def _stop_listener():
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_after_fork():
+    # Only the forking thread survives fork, so the child needs its own
+    # listener (Airflow forks task runners from the process that parsed
+    # the DAG)
+    global _lock
+    _lock = threading.Lock()
+    _start_listener()
+
+
+_start_listener()
+os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(_stop_listener)
+
+# Get or create logger. Calls only enqueue the record; the I/O happens
+# on the listener thread.
+_logger = logging.getLogger('infrapulse_etl')
+_logger.setLevel(logging.INFO)
+_logger.addHandler(_queue_handler)
+_logger.propagate = False
+
+def log_info(msg, *args):
+    _logger.info(msg, *args)
+
+def log_error(msg, *args):
+    _logger.error(msg, *args)
+
+def log_warning(msg, *args):
+    _logger.warning(msg, *args)
+
+
+class Progress:
+    """Rate-limited progress messages for hot loops
+
+        progress = Progress("Progress: %d/%d records processed")
+        for idx, row in enumerate(rows, 1):
+            ...
+            progress.update(idx, len(rows))
+
+    update() logs at most once every `interval` seconds; other calls cost
+    a clock read and a comparison. done() logs the final state.
+    """
+
+    def __init__(self, msg, interval=PROGRESS_INTERVAL_SECONDS):
+        self.msg = msg
+        self.interval = interval
+        self._next = time.monotonic() + interval
+
+    def update(self, *args):
+        now = time.monotonic()
+        if now >= self._next:
+            self._next = now + self.interval
+            _logger.info(self.msg, *args)
+
+    def done(self, *args):
+        _logger.info(self.msg, *args)
@@ -0,0 +1,145 @@
+import errno
+import os
+import shutil
+import time
+from collections import namedtuple
+
+from extract import CSV_EXTENSIONS
+from elt_logger import log_info, log_error
+
+# Raw exports the ingest step picks up (plain or compressed CSV)
+RAW_EXTENSIONS = CSV_EXTENSIONS
+
+# Files modified less than this many seconds ago are taken to be still
+# being written and are left for the next run
+SETTLE_SECONDS = float(os.getenv("ETL_INGEST_SETTLE_SECONDS", 60))
+
+# "move" renames raw files into staging; "link" hardlinks them and leaves
+# the raw file in place. Either way only a metadata operation, unless raw
+# and staging are on different filesystems, where the file is copied.
+INGEST_MODES = ("move", "link")
+INGEST_MODE = os.getenv("ETL_INGEST_MODE", "move")
+
+INGESTED = "INGESTED"
+SKIPPED = "SKIPPED"
+FAILED = "FAILED"
+
+# Outcome for one raw file. size and mtime are the raw file's when it was
+# picked up; method is rename / link / copy; reason says why a file was
+# skipped or failed.
+IngestResult = namedtuple(
+    "IngestResult", ["source", "path", "size", "mtime", "status", "method", "reason"]
+)
+
+
+def find_raw_files(raw_dir):
+    """Raw exports in raw_dir and its direct subdirectories (raw/<date>/)"""
+    paths = []
+    for root, dirs, files in os.walk(raw_dir):
+        if root != raw_dir:
+            dirs.clear()
+        paths.extend(
+            os.path.join(root, name)
+            for name in files
+            if name.endswith(RAW_EXTENSIONS) and not name.startswith(".")
+        )
+    return sorted(paths)
+
+
+def _signature(stat):
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _place(source, target, mode, signature):
+    """Make source appear at target in one step; returns the method used
+
+    Renames (move) or hardlinks (link). Across filesystems the file is
+    copied next to target and renamed into place; if source changed
+    during the copy the copy is dropped and None is returned.
+    """
+    try:
+        if mode == "link":
+            os.link(source, target)
+            return "link"
+        os.rename(source, target)
+        return "rename"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    tmp_path = target + ".tmp"
+    try:
+        shutil.copy2(source, tmp_path)
+        if _signature(os.stat(source)) != signature:
+            os.remove(tmp_path)
+            return None
+        os.replace(tmp_path, target)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if mode == "move":
+        os.remove(source)
+    return "copy"
+
+
+def ingest_file(source, staging_dir, mode=INGEST_MODE, settled_before=None):
+    """Stage one raw file; returns its IngestResult
+
+    Empty files, files modified after settled_before (epoch seconds) and
+    files whose name is already staged are skipped and stay in raw.
+    """
+    stat = os.stat(source)
+    target = os.path.join(staging_dir, os.path.basename(source))
+    result = IngestResult(source, target, stat.st_size, stat.st_mtime, SKIPPED, None, None)
+
+    if stat.st_size == 0:
+        return result._replace(reason="empty")
+    if settled_before is not None and stat.st_mtime > settled_before:
+        return result._replace(reason="still being written")
+    if os.path.exists(target):
+        return result._replace(reason="already staged")
+
+    method = _place(source, target, mode, _signature(stat))
+    if method is None:
+        return result._replace(reason="changed while copying")
+    return result._replace(status=INGESTED, method=method)
+
+
+def ingest_raw_dir(raw_dir, staging_dir, mode=INGEST_MODE, settle_seconds=SETTLE_SECONDS):
+    """Stage every settled raw export; returns one IngestResult per file
+
+    Cost is per file, not per byte, except across filesystems. If any
+    file fails, a RuntimeError naming them is raised after the others
+    are staged.
+    """
+    if mode not in INGEST_MODES:
+        raise ValueError(f"Unknown ingest mode {mode!r}; expected one of {', '.join(INGEST_MODES)}")
+    if not os.path.isdir(raw_dir):
+        log_info("No raw data directory at %s. Nothing to ingest.", raw_dir)
+        return []
+
+    os.makedirs(staging_dir, exist_ok=True)
+    settled_before = time.time() - settle_seconds
+    results = []
+    for source in find_raw_files(raw_dir):
+        try:
+            result = ingest_file(source, staging_dir, mode, settled_before)
+        except OSError as e:
+            log_error("Could not ingest %s: %s", source, e)
+            result = IngestResult(source, None, None, None, FAILED, None, str(e))
+        if result.status == SKIPPED:
+            log_info("Skipping %s: %s", source, result.reason)
+        results.append(result)
+
+    ingested = [result for result in results if result.status == INGESTED]
+    log_info(
+        "Ingested %s of %s raw files into %s "
+        "(%s bytes)",
+        len(ingested), len(results), staging_dir, sum(result.size for result in ingested)
+    )
+
+    failed = [result.source for result in results if result.status == FAILED]
+    if failed:
+        raise RuntimeError(f"Ingest failed for {len(failed)} of {len(results)} files: {', '.join(failed)}")
+    return results
@@ -1,72 +1,637 @@
-import psycopg2
 import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import psycopg2
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from db import get_connection, max_connections, release_connection
+from dimensions import asset_key_resolver
+from manifest import (
+    LOADED, Checkpoint, clear_checkpoint, load_checkpoint, record_file, save_checkpoint,
+)
+from partitions import ensure_partitions, is_partitioned
+from quarantine import split_quarantine, write_quarantine
+from rollups import update_rollups
+from schema import ensure_schema
 from elt_logger import log_info, log_error
 
-def load_failures(df):
-    """Load failures to PostgreSQL warehouse (cloud-ready)"""
+# Rows rendered to CSV per slice while streaming a COPY
+COPY_CHUNK_ROWS = 100_000
+
+# Connections the facts of one load are split across (see ShardedFactLoader)
+LOAD_SHARDS = int(os.getenv("ETL_LOAD_SHARDS", 1))
+
+FACT_COLUMNS = [
+    "asset_key", "date_key", "failure_type", "outage_minutes", "resolved", "batch_id", "row_hash",
+]
+
+INSERT_DATE_SQL = """
+    INSERT INTO dim_date (date_key, full_date)
+    VALUES (%s, %s)
+    ON CONFLICT (date_key) DO NOTHING
+"""
+
+INSERT_DATES_SQL = """
+    INSERT INTO dim_date (date_key, full_date)
+    SELECT * FROM unnest(%s::int[], %s::date[])
+    ON CONFLICT (date_key) DO NOTHING
+"""
+
+INSERT_FACT_SQL = f"""
+    INSERT INTO fact_service_failure ({', '.join(FACT_COLUMNS)})
+    VALUES ({', '.join(['%s'] * len(FACT_COLUMNS))})
+    ON CONFLICT (row_hash, date_key) DO NOTHING
+"""
+
+# Fingerprints of a chunk that are already loaded. One index probe of
+# idx_fact_row_hash per row, so the cost does not grow with the table.
+EXISTING_FACTS_SQL = """
+    SELECT f.row_hash
+    FROM fact_service_failure f
+    JOIN unnest(%s::bigint[], %s::int[]) AS k (row_hash, date_key)
+      ON f.row_hash = k.row_hash AND f.date_key = k.date_key
+"""
+
+COPY_FACTS_SQL = (
+    f"COPY fact_service_failure ({', '.join(FACT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+)
+
+# Per-connection buffer for facts whose COPY hit a concurrent load's rows
+# (see _copy_facts); emptied after each use and again at commit
+FACT_BUFFER_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS fact_copy_buffer ON COMMIT DELETE ROWS AS
+    SELECT {', '.join(FACT_COLUMNS)} FROM fact_service_failure WITH NO DATA
+"""
+
+INSERT_BUFFERED_FACTS_SQL = f"""
+    INSERT INTO fact_service_failure ({', '.join(FACT_COLUMNS)})
+    SELECT {', '.join(FACT_COLUMNS)} FROM fact_copy_buffer
+    ON CONFLICT (row_hash, date_key) DO NOTHING
+"""
+
+STAGING_COLUMNS = [
+    "batch_id", "asset_id", "date_key", "full_date",
+    "failure_type", "outage_minutes", "resolved", "row_hash",
+]
+
+# Set-based merge of one batch from stg_service_failure; dim_asset and
+# dim_date first, so the fact INSERT can join to both
+MERGE_ASSETS_SQL = """
+    INSERT INTO dim_asset (asset_id)
+    SELECT DISTINCT asset_id FROM stg_service_failure WHERE batch_id = %s
+    ON CONFLICT (asset_id) DO NOTHING
+"""
+
+MERGE_DATES_SQL = """
+    INSERT INTO dim_date (date_key, full_date)
+    SELECT DISTINCT ON (date_key) date_key, full_date
+    FROM stg_service_failure WHERE batch_id = %s
+    ON CONFLICT (date_key) DO NOTHING
+"""
+
+MERGE_FACTS_SQL = f"""
+    INSERT INTO fact_service_failure ({', '.join(FACT_COLUMNS)})
+    SELECT a.asset_key, s.date_key, s.failure_type, s.outage_minutes, s.resolved,
+           s.batch_id, s.row_hash
+    FROM stg_service_failure s
+    JOIN dim_asset a ON a.asset_id = s.asset_id
+    WHERE s.batch_id = %s
+    ON CONFLICT (row_hash, date_key) DO NOTHING
+"""
+
+# Opened first so its run_id can tag the batch's facts
+START_RUN_SQL = """
+    INSERT INTO etl_metadata (records_loaded, status, source_file, dag_run_id)
+    VALUES (0, 'RUNNING', %s, %s)
+    RETURNING run_id
+"""
+
+FINISH_RUN_SQL = """
+    UPDATE etl_metadata
+    SET records_loaded = %s, records_quarantined = %s, status = %s
+    WHERE run_id = %s
+"""
+
+RESUME_RUN_SQL = """
+    UPDATE etl_metadata SET status = 'RUNNING', dag_run_id = %s
+    WHERE run_id = %s
+"""
+
+# Summary of one load_failure_chunks call; batch_id is the etl_metadata
+# run_id stamped on every fact row it inserted
+LoadResult = namedtuple(
+    "LoadResult",
+    ["batch_id", "records_loaded", "records_quarantined", "assets_inserted", "dates_inserted"],
+)
+
+
+class DataFrameCsvReader:
+    """File-like object that renders a DataFrame as CSV one slice at a time.
+
+    Lets COPY ... FROM STDIN stream millions of rows without building the
+    whole CSV text in memory. Slices are written by Arrow's CSV writer
+    straight from the column buffers (zero-copy for Arrow-backed
+    columns), so no row passes through Python objects.
+    """
+
+    def __init__(self, df, chunk_rows=COPY_CHUNK_ROWS):
+        self._slices = (
+            df.iloc[start:start + chunk_rows]
+            for start in range(0, len(df), chunk_rows)
+        )
+        self._buffer = b""
+        self._pos = 0
+
+    def read(self, size=-1):
+        if self._pos >= len(self._buffer):
+            chunk = next(self._slices, None)
+            if chunk is None:
+                return b""
+            sink = pa.BufferOutputStream()
+            pv.write_csv(
+                pa.Table.from_pandas(chunk, preserve_index=False), sink,
+                pv.WriteOptions(include_header=False),
+            )
+            self._buffer = sink.getvalue().to_pybytes()
+            self._pos = 0
+
+        end = len(self._buffer) if size is None or size < 0 else self._pos + size
+        data = self._buffer[self._pos:end]
+        self._pos = end
+        return data
 
-    # Use environment variables for cloud deployment
-    conn_params = {
-        "host": os.getenv("POSTGRES_HOST", "postgres"),
-        "port": int(os.getenv("POSTGRES_PORT", 5432)),
-        "database": os.getenv("POSTGRES_DB", "railway"),
-        "user": os.getenv("POSTGRES_USER"),
-        "password": os.getenv("POSTGRES_PASSWORD"),
-        "sslmode": os.getenv("POSTGRES_SSL_MODE", "require"),  # Required for Railway
-    }
+    readline = read
 
+
+def _load_rows(cur, df, batch_id):
+    """Row-by-row load (dim_date and fact inserts per record)"""
+    records_loaded = 0
+    dates_inserted = 0
+
+    asset_keys, assets_inserted = asset_key_resolver.resolve(
+        cur, df["asset_id"].tolist()
+    )
+
+    for _, row in df.iterrows():
+
+        cur.execute(INSERT_DATE_SQL, (row["date_key"], row["start_time"].date()))
+
+        if cur.rowcount > 0:
+            dates_inserted += 1
+
+        cur.execute(INSERT_FACT_SQL, (
+            asset_keys[row["asset_id"]],
+            row["date_key"],
+            row["failure_type"],
+            int(row["outage_minutes"]),
+            None if pd.isna(row["resolved"]) else bool(row["resolved"]),
+            batch_id,
+            int(row["row_hash"])
+        ))
+
+        # 0 when the row's fingerprint is already loaded
+        records_loaded += cur.rowcount
+
+    return records_loaded, assets_inserted, dates_inserted
+
+
+def _resolve_dimensions(cur, df):
+    """Set-based dim_asset / dim_date upserts for df
+
+    Returns (asset_keys, assets_inserted, dates_inserted), asset_keys
+    being an int64 Series aligned with df.
+    """
+    asset_keys, assets_inserted = asset_key_resolver.map_keys(cur, df["asset_id"])
+
+    dates = df.drop_duplicates("date_key")
+    cur.execute(INSERT_DATES_SQL, (
+        dates["date_key"].astype("int64").tolist(),
+        dates["start_time"].dt.date.tolist(),
+    ))
+    return asset_keys, assets_inserted, cur.rowcount
+
+
+def new_facts(cur, df):
+    """Boolean mask of df's rows to insert
+
+    Drops rows whose row_hash repeats an earlier row of df or is already
+    in fact_service_failure (as seen by cur's transaction).
+    """
+    fresh = ~df["row_hash"].duplicated()
+    cur.execute(EXISTING_FACTS_SQL, (
+        df["row_hash"].tolist(), df["date_key"].astype("int64").tolist()
+    ))
+    existing = [row[0] for row in cur.fetchall()]
+    if existing:
+        fresh &= ~df["row_hash"].isin(existing)
+    return fresh.to_numpy()
+
+
+def _copy_facts(cur, df, asset_keys, batch_id):
+    """COPY df's new fact rows (see new_facts); returns the number inserted
+
+    The COPY has no ON CONFLICT, so a concurrent load committing one of the
+    fingerprints after the new_facts lookup fails it on idx_fact_row_hash.
+    It runs under a savepoint; on that error the rows go through
+    fact_copy_buffer and an INSERT ... ON CONFLICT DO NOTHING instead.
+    """
+    fresh = new_facts(cur, df)
+    df, asset_keys = df[fresh], asset_keys[fresh]
+    facts = df.assign(
+        asset_key=asset_keys,
+        date_key=df["date_key"].astype("int64"),
+        outage_minutes=df["outage_minutes"].astype("int64"),
+        batch_id=batch_id,
+    )[FACT_COLUMNS]
+
+    cur.execute("SAVEPOINT copy_facts")
     try:
-        conn = psycopg2.connect(**conn_params)
+        cur.copy_expert(COPY_FACTS_SQL, DataFrameCsvReader(facts), size=1 << 20)
+    except psycopg2.errors.UniqueViolation:
+        cur.execute("ROLLBACK TO SAVEPOINT copy_facts")
+        return _insert_buffered_facts(cur, facts)
+    cur.execute("RELEASE SAVEPOINT copy_facts")
+    return len(facts)
+
+
+def _insert_buffered_facts(cur, facts):
+    """Insert facts via fact_copy_buffer, skipping rows already loaded"""
+    cur.execute(FACT_BUFFER_SQL)
+    cur.copy_expert(
+        COPY_FACTS_SQL.replace("fact_service_failure", "fact_copy_buffer", 1),
+        DataFrameCsvReader(facts),
+        size=1 << 20,
+    )
+    cur.execute(INSERT_BUFFERED_FACTS_SQL)
+    inserted = cur.rowcount
+    cur.execute("TRUNCATE fact_copy_buffer")
+    return inserted
+
+
+def _load_copy(cur, df, batch_id):
+    """Bulk load: set-based dimension upserts, then COPY the facts"""
+    asset_keys, assets_inserted, dates_inserted = _resolve_dimensions(cur, df)
+    return _copy_facts(cur, df, asset_keys, batch_id), assets_inserted, dates_inserted
+
+
+def _load_merge(cur, df, batch_id):
+    """COPY into the UNLOGGED staging table, then merge it with set-based SQL
+
+    Dimension lookups happen in the database (a join against dim_asset)
+    instead of in Python. The batch's staging rows are removed in the
+    same transaction, so concurrent loads never see each other's rows.
+    """
+    staged = df.assign(
+        batch_id=batch_id,
+        date_key=df["date_key"].astype("int64"),
+        full_date=df["start_time"].dt.date,
+        outage_minutes=df["outage_minutes"].astype("int64"),
+    )[STAGING_COLUMNS]
+
+    cur.copy_expert(
+        f"COPY stg_service_failure ({', '.join(STAGING_COLUMNS)}) "
+        "FROM STDIN WITH (FORMAT csv)",
+        DataFrameCsvReader(staged),
+        size=1 << 20,
+    )
+
+    cur.execute(MERGE_ASSETS_SQL, (batch_id,))
+    assets_inserted = cur.rowcount
+    cur.execute(MERGE_DATES_SQL, (batch_id,))
+    dates_inserted = cur.rowcount
+    cur.execute(MERGE_FACTS_SQL, (batch_id,))
+    records_loaded = cur.rowcount
+
+    cur.execute("DELETE FROM stg_service_failure WHERE batch_id = %s", (batch_id,))
+    return records_loaded, assets_inserted, dates_inserted
+
+
+LOAD_MODES = {
+    "row": _load_rows,
+    "copy": _load_copy,
+    "merge": _load_merge,
+}
+
+
+class ShardedFactLoader:
+    """COPYs each chunk's facts over several connections at once
+
+    Dimensions (and monthly partitions) are resolved first on a separate
+    connection and committed per chunk, so every shard's foreign key
+    checks see them. The facts are then split by a hash of asset_id and
+    loaded concurrently, one thread per shard. Shard 0 is the caller's
+    connection, so its rows commit together with the etl_metadata row;
+    the other shards keep their transactions open until commit().
+    """
+
+    def __init__(self, conn, shards, partitioned=False):
+        self.shards = shards
+        self.partitioned = partitioned
+        self.committed = False
+        self._dim_conn = None
+        self._conns = []
+        self._executor = None
+        try:
+            self._dim_conn = get_connection()
+            for _ in range(shards - 1):
+                self._conns.append(get_connection())
+        except Exception:
+            self.close()
+            raise
+        self._cursors = [conn.cursor()] + [shard.cursor() for shard in self._conns]
+        self._executor = ThreadPoolExecutor(max_workers=shards, thread_name_prefix="etl-shard")
+
+    def load(self, df, batch_id):
+        """Load one chunk; returns (records_loaded, assets_inserted, dates_inserted)"""
+        with self._dim_conn.cursor() as cur:
+            if self.partitioned:
+                ensure_partitions(cur, df["date_key"].unique())
+            asset_keys, assets_inserted, dates_inserted = _resolve_dimensions(cur, df)
+        self._dim_conn.commit()
+        asset_key_resolver.commit()
+
+        shard_of = (pd.util.hash_pandas_object(df["asset_id"], index=False) % self.shards).to_numpy()
+        futures = []
+        for shard, cur in enumerate(self._cursors):
+            in_shard = shard_of == shard
+            if in_shard.any():
+                futures.append(self._executor.submit(
+                    _copy_facts, cur, df[in_shard], asset_keys[in_shard], batch_id
+                ))
+
+        # Wait for every shard before surfacing an error, so no COPY is
+        # still running when the connections are rolled back
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return sum(future.result() for future in futures), assets_inserted, dates_inserted
+
+    def commit(self):
+        """Commit shards 1..N-1; the caller commits shard 0 afterwards"""
+        self.committed = True
+        for shard in self._conns:
+            shard.commit()
+
+    def discard(self, batch_id):
+        """Delete batch_id's facts after a failure that followed commit()"""
+        with self._dim_conn.cursor() as cur:
+            cur.execute("DELETE FROM fact_service_failure WHERE batch_id = %s", (batch_id,))
+        self._dim_conn.commit()
+
+    def close(self):
+        """Release every extra connection, rolling back uncommitted shards"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        for extra in [self._dim_conn] + self._conns:
+            if extra is not None:
+                release_connection(extra)
+        self._dim_conn = None
+        self._conns = []
+
+
+def load_failure_chunks(chunks, mode="copy", source_file=None, staged_file=None,
+                        shards=LOAD_SHARDS):
+    """Load an iterable of transformed DataFrames in a single transaction
+
+    Chunks are loaded as they arrive, so only the current one has to be
+    held in memory. Rows tagged by quality_checks.apply_quality_rules go
+    to etl_quarantine instead of the star schema. One etl_metadata row is
+    written for the whole run, tagged with source_file and the Airflow
+    DAG run; its run_id is stamped on every fact row as batch_id. With a
+    manifest.StagedFile the file is recorded in etl_file_manifest in the
+    same transaction, as are the rollups (see rollups.py). With shards > 1 the facts are loaded over that many
+    connections at once (see ShardedFactLoader). Returns a LoadResult.
+    """
+
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown load mode: {mode}")
+    if shards > 1:
+        if mode != "copy":
+            raise ValueError("Sharded loads need mode='copy'")
+        # One connection per shard plus one for the dimensions
+        if shards + 1 > max_connections():
+            raise ValueError(f"{shards} load shards need POSTGRES_POOL_MAX >= {shards + 1}")
+
+    if staged_file is not None and source_file is None:
+        source_file = staged_file.path
+
+    conn = None
+    sharded = None
+    try:
+        conn = get_connection()
+        ensure_schema(conn)
         cur = conn.cursor()
 
         records_loaded = 0
+        records_quarantined = 0
+        duplicates_skipped = 0
+        assets_inserted = 0
+        dates_inserted = 0
+
+        cur.execute(START_RUN_SQL, (source_file, os.getenv("AIRFLOW_CTX_DAG_RUN_ID")))
+        batch_id = cur.fetchone()[0]
+
+        partitioned = is_partitioned(cur)
+        if shards > 1:
+            sharded = ShardedFactLoader(conn, shards, partitioned)
+
+        for chunk in chunks:
+            chunk, rejected = split_quarantine(chunk)
+            records_quarantined += write_quarantine(cur, rejected, source_file)
+
+            if sharded is not None:
+                loaded, assets, dates = sharded.load(chunk, batch_id)
+            else:
+                if partitioned:
+                    ensure_partitions(cur, chunk["date_key"].unique())
+                loaded, assets, dates = LOAD_MODES[mode](cur, chunk, batch_id)
+            records_loaded += loaded
+            duplicates_skipped += len(chunk) - loaded
+            assets_inserted += assets
+            dates_inserted += dates
 
-        for _, row in df.iterrows():
-
-            cur.execute("""
-                INSERT INTO dim_asset (asset_id)
-                VALUES (%s)
-                ON CONFLICT (asset_id) DO NOTHING
-            """, (row["asset_id"],))
-
-            cur.execute("""
-                INSERT INTO dim_date (date_key, full_date)
-                VALUES (%s, %s)
-                ON CONFLICT (date_key) DO NOTHING
-            """, (row["date_key"], row["start_time"].date()))
-
-            cur.execute("""
-                SELECT asset_key FROM dim_asset WHERE asset_id=%s
-            """, (row["asset_id"],))
-
-            asset_key = cur.fetchone()[0]
-
-            cur.execute("""
-                INSERT INTO fact_service_failure
-                (asset_key, date_key, failure_type, outage_minutes, resolved)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (
-                asset_key,
-                row["date_key"],
-                row["failure_type"],
-                int(row["outage_minutes"]),
-                row["resolved"]
-            ))
-
-            records_loaded += 1
-
-        cur.execute("""
-            INSERT INTO etl_metadata (records_loaded, status)
-            VALUES (%s, %s)
-        """, (records_loaded, "SUCCESS"))
+        # The other shards commit first so the rollups can see their rows
+        if sharded is not None:
+            sharded.commit()
+        update_rollups(cur, batch_id)
 
+        cur.execute(FINISH_RUN_SQL, (records_loaded, records_quarantined, "SUCCESS", batch_id))
+
+        if staged_file is not None:
+            record_file(cur, staged_file, records_loaded, LOADED)
+
+        conn.commit()
+        asset_key_resolver.commit()
+        cur.close()
+
+        log_info(
+            "Loaded %s records as batch %s (%s mode, "
+            "%s new assets, %s new dates, "
+            "%s quarantined, %s duplicates skipped)",
+            records_loaded, batch_id, mode, assets_inserted, dates_inserted,
+            records_quarantined, duplicates_skipped,
+        )
+        return LoadResult(
+            batch_id, records_loaded, records_quarantined, assets_inserted, dates_inserted
+        )
+
+    except Exception as e:
+        asset_key_resolver.rollback()
+        log_error("Failed to load data: %s", e)
+        if sharded is not None and sharded.committed:
+            try:
+                sharded.discard(batch_id)
+            except Exception as cleanup_error:
+                log_error("Could not remove facts of batch %s: %s", batch_id, cleanup_error)
+        raise
+    finally:
+        if sharded is not None:
+            sharded.close()
+        if conn is not None:
+            release_connection(conn)
+
+
+def load_failure_chunks_resumable(chunks, staged_file, mode="copy", source_file=None):
+    """Load chunks committing after each one, so a failed load can resume
+
+    Every chunk is committed together with the file's row in
+    etl_load_checkpoint (see manifest.Checkpoint): the rows of the chunk
+    stream consumed so far and the batch's running totals. A later call
+    for the same file content skips the committed rows and carries on
+    with the same etl_metadata batch, so no fact is inserted twice. The
+    chunks must be cut the same way on every attempt (same file and
+    ETL_CHUNK_SIZE). Rollups, the manifest row and the SUCCESS status are
+    written with the last commit; until then the batch is RUNNING, or
+    FAILED after an error. Returns a LoadResult.
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Resumable loads need one of the modes {', '.join(LOAD_MODES)}, not {mode}")
+
+    if source_file is None:
+        source_file = staged_file.path
+
+    conn = None
+    checkpoint = None
+    try:
+        conn = get_connection()
+        ensure_schema(conn)
+        cur = conn.cursor()
+
+        dag_run_id = os.getenv("AIRFLOW_CTX_DAG_RUN_ID")
+        checkpoint = load_checkpoint(cur, staged_file.file_hash)
+        if checkpoint is None:
+            cur.execute(START_RUN_SQL, (source_file, dag_run_id))
+            checkpoint = Checkpoint(cur.fetchone()[0], 0, 0, 0)
+            save_checkpoint(cur, staged_file.file_hash, checkpoint)
+        else:
+            # The batch now belongs to this DAG run, for verify_data
+            cur.execute(RESUME_RUN_SQL, (dag_run_id, checkpoint.batch_id))
+            log_info(
+                "Resuming batch %s of %s "
+                "after %s committed rows",
+                checkpoint.batch_id, source_file, checkpoint.rows_committed
+            )
+        conn.commit()
+        batch_id = checkpoint.batch_id
+
+        assets_inserted = 0
+        dates_inserted = 0
+        duplicates_skipped = 0
+        rows_seen = 0
+
+        partitioned = is_partitioned(cur)
+        for chunk in chunks:
+            chunk_start = rows_seen
+            rows_seen += len(chunk)
+            if rows_seen <= checkpoint.rows_committed:
+                continue
+            if chunk_start < checkpoint.rows_committed:
+                chunk = chunk.iloc[checkpoint.rows_committed - chunk_start:]
+
+            chunk, rejected = split_quarantine(chunk)
+            quarantined = write_quarantine(cur, rejected, source_file)
+            if partitioned:
+                ensure_partitions(cur, chunk["date_key"].unique())
+            loaded, assets, dates = LOAD_MODES[mode](cur, chunk, batch_id)
+            duplicates_skipped += len(chunk) - loaded
+
+            committed = Checkpoint(
+                batch_id, rows_seen,
+                checkpoint.records_loaded + loaded,
+                checkpoint.records_quarantined + quarantined,
+            )
+            save_checkpoint(cur, staged_file.file_hash, committed)
+            conn.commit()
+            asset_key_resolver.commit()
+            checkpoint = committed
+
+            assets_inserted += assets
+            dates_inserted += dates
+
+        if rows_seen < checkpoint.rows_committed:
+            raise ValueError(
+                f"{source_file} yielded {rows_seen} rows but {checkpoint.rows_committed} "
+                "were already committed; was ETL_CHUNK_SIZE changed?"
+            )
+
+        update_rollups(cur, batch_id)
+        cur.execute(FINISH_RUN_SQL, (
+            checkpoint.records_loaded, checkpoint.records_quarantined, "SUCCESS", batch_id
+        ))
+        record_file(cur, staged_file, checkpoint.records_loaded, LOADED)
+        clear_checkpoint(cur, staged_file.file_hash)
         conn.commit()
         cur.close()
-        conn.close()
 
-        log_info(f"Loaded {records_loaded} records")
+        log_info(
+            "Loaded %s records as batch %s (%s mode, "
+            "resumable, %s new assets, %s new dates, "
+            "%s quarantined, %s duplicates skipped)",
+            checkpoint.records_loaded, batch_id, mode, assets_inserted, dates_inserted,
+            checkpoint.records_quarantined, duplicates_skipped,
+        )
+        return LoadResult(
+            batch_id, checkpoint.records_loaded, checkpoint.records_quarantined,
+            assets_inserted, dates_inserted,
+        )
 
     except Exception as e:
-        log_error(f"Failed to load data: {str(e)}")
+        asset_key_resolver.rollback()
+        log_error("Failed to load data: %s", e)
+        if conn is not None and checkpoint is not None:
+            try:
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute(FINISH_RUN_SQL, (
+                        checkpoint.records_loaded, checkpoint.records_quarantined,
+                        "FAILED", checkpoint.batch_id,
+                    ))
+                conn.commit()
+                log_info(
+                    "%s rows of batch %s stay "
+                    "committed; the next attempt resumes after them",
+                    checkpoint.rows_committed, checkpoint.batch_id
+                )
+            except Exception as cleanup_error:
+                log_error("Could not mark batch %s FAILED: %s", checkpoint.batch_id, cleanup_error)
         raise
+    finally:
+        if conn is not None:
+            release_connection(conn)
+
+
+def load_failures(df, mode="copy", source_file=None, staged_file=None, shards=LOAD_SHARDS):
+    """Load failures to PostgreSQL warehouse (cloud-ready)
 
+    mode="copy" streams the facts with COPY ... FROM STDIN and resolves the
+    dimensions in a handful of set-based statements; mode="merge" COPYs
+    into the stg_service_failure staging table and merges it into the star
+    schema in SQL; mode="row" keeps the original per-row inserts.
+    """
+    return load_failure_chunks(
+        [df], mode=mode, source_file=source_file, staged_file=staged_file, shards=shards
+    )
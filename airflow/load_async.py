@@ -0,0 +1,193 @@
+import asyncio
+import os
+
+import psycopg
+
+from db import connection, libpq_params
+from dimensions import asset_key_resolver
+from load import (
+    EXISTING_FACTS_SQL, FACT_COLUMNS, FINISH_RUN_SQL, INSERT_DATES_SQL, INSERT_FACT_SQL,
+    START_RUN_SQL, LoadResult,
+)
+from manifest import LOADED, RECORD_FILE_SQL
+from partitions import (
+    EXISTING_PARTITIONS_SQL, PARTITION_LOCK_KEY, PARTITION_LOCK_SQL, covering_partitions,
+    is_partitioned, partition_ddl,
+)
+from quarantine import quarantine_rows, split_quarantine
+from rollups import UPDATE_ROLLUP_SQL
+from schema import ensure_schema
+from elt_logger import log_info, log_error
+
+# psycopg 3 loaders. Inside a pipeline, statements are sent without
+# waiting for each reply, so a batch costs one round trip instead of one
+# per row. prepare_threshold=0 makes every statement a server-side
+# prepared statement from its first execution.
+
+
+def _prepare_warehouse():
+    """Apply schema migrations; returns whether the fact table is partitioned"""
+    with connection() as conn:
+        ensure_schema(conn)
+        with conn.cursor() as cur:
+            return is_partitioned(cur)
+
+
+async def _add_partitions(cur, date_keys):
+    """partitions.ensure_partitions on an async cursor
+
+    Runs in the load transaction, as in load.py, so the partition DDL and
+    the facts commit or roll back together.
+    """
+    names = covering_partitions(date_keys)
+    if not names:
+        return
+    await cur.execute(EXISTING_PARTITIONS_SQL, (list(names),))
+    if {row[0] for row in await cur.fetchall()} >= set(names):
+        return
+
+    await cur.execute(PARTITION_LOCK_SQL, (PARTITION_LOCK_KEY,))
+    await cur.execute(EXISTING_PARTITIONS_SQL, (list(names),))
+    existing = {row[0] for row in await cur.fetchall()}
+    for name in sorted(set(names) - existing):
+        for statement in partition_ddl(name, *names[name]):
+            await cur.execute(statement)
+
+
+async def _write_quarantine(cur, df, source_file):
+    if df.empty:
+        return 0
+    statement, data = quarantine_rows(df, source_file)
+    async with cur.copy(statement) as copy:
+        await copy.write(data)
+    return len(df)
+
+
+async def _load_chunk(conn, cur, df, batch_id):
+    asset_keys, assets_inserted = await asset_key_resolver.map_keys_async(cur, df["asset_id"])
+
+    dates = df.drop_duplicates("date_key")
+    await cur.execute(INSERT_DATES_SQL, (
+        dates["date_key"].astype("int64").tolist(),
+        dates["start_time"].dt.date.tolist(),
+    ))
+    dates_inserted = cur.rowcount
+
+    # Same skip as load.new_facts; INSERT_FACT_SQL's ON CONFLICT covers
+    # rows a concurrent load commits in between
+    fresh = ~df["row_hash"].duplicated()
+    await cur.execute(EXISTING_FACTS_SQL, (
+        df["row_hash"].tolist(), df["date_key"].astype("int64").tolist()
+    ))
+    existing = [row[0] for row in await cur.fetchall()]
+    if existing:
+        fresh &= ~df["row_hash"].isin(existing)
+    df, asset_keys = df[fresh], asset_keys[fresh]
+
+    facts = df.assign(
+        asset_key=asset_keys,
+        date_key=df["date_key"].astype("int64"),
+        outage_minutes=df["outage_minutes"].astype("int64"),
+        batch_id=batch_id,
+    )[FACT_COLUMNS].astype(object)
+    # psycopg cannot adapt pd.NA
+    facts = facts.where(facts.notna(), None)
+
+    async with conn.pipeline():
+        await cur.executemany(INSERT_FACT_SQL, facts.itertuples(index=False, name=None))
+
+    # Summed over the statements, so rows ON CONFLICT skipped are not counted
+    records_loaded = cur.rowcount if len(facts) else 0
+    return records_loaded, assets_inserted, dates_inserted
+
+
+async def load_failure_chunks_async(chunks, source_file=None, staged_file=None):
+    """asyncio counterpart of load.load_failure_chunks over psycopg 3
+
+    Same transaction, etl_metadata, quarantine, rollup and manifest handling;
+    the fact rows go out as pipelined prepared INSERTs. chunks may be a
+    blocking iterator (e.g. pipeline.prepared_chunks): it is advanced on
+    a worker thread so the event loop stays free. Returns a LoadResult.
+    """
+    if staged_file is not None and source_file is None:
+        source_file = staged_file.path
+
+    partitioned = await asyncio.to_thread(_prepare_warehouse)
+    chunks = iter(chunks)
+
+    try:
+        async with await psycopg.AsyncConnection.connect(
+            **libpq_params(), prepare_threshold=0
+        ) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(START_RUN_SQL, (source_file, os.getenv("AIRFLOW_CTX_DAG_RUN_ID")))
+                batch_id = (await cur.fetchone())[0]
+
+                records_loaded = 0
+                records_quarantined = 0
+                duplicates_skipped = 0
+                assets_inserted = 0
+                dates_inserted = 0
+
+                while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                    chunk, rejected = split_quarantine(chunk)
+                    records_quarantined += await _write_quarantine(cur, rejected, source_file)
+
+                    if partitioned:
+                        await _add_partitions(cur, chunk["date_key"].unique())
+
+                    loaded, assets, dates = await _load_chunk(conn, cur, chunk, batch_id)
+                    records_loaded += loaded
+                    duplicates_skipped += len(chunk) - loaded
+                    assets_inserted += assets
+                    dates_inserted += dates
+
+                for statement in UPDATE_ROLLUP_SQL:
+                    await cur.execute(statement, (batch_id,))
+                await cur.execute(
+                    FINISH_RUN_SQL, (records_loaded, records_quarantined, "SUCCESS", batch_id)
+                )
+                if staged_file is not None:
+                    await cur.execute(RECORD_FILE_SQL, (
+                        staged_file.file_hash, staged_file.path, staged_file.file_size,
+                        records_loaded, LOADED,
+                    ))
+            # Leaving the connection block commits
+        asset_key_resolver.commit()
+
+    except Exception as e:
+        asset_key_resolver.rollback()
+        log_error("Failed to load data: %s", e)
+        raise
+
+    log_info(
+        "Loaded %s records as batch %s (pipeline mode, "
+        "%s new assets, %s new dates, "
+        "%s quarantined, %s duplicates skipped)",
+        records_loaded, batch_id, assets_inserted, dates_inserted,
+        records_quarantined, duplicates_skipped,
+    )
+    return LoadResult(
+        batch_id, records_loaded, records_quarantined, assets_inserted, dates_inserted
+    )
+
+
+async def load_failures_async(df, source_file=None, staged_file=None):
+    """asyncio counterpart of load.load_failures"""
+    return await load_failure_chunks_async(
+        [df], source_file=source_file, staged_file=staged_file
+    )
+
+
+def load_failure_chunks_pipeline(chunks, source_file=None, staged_file=None):
+    """Blocking psycopg 3 pipeline-mode load (not from inside an event loop)"""
+    return asyncio.run(load_failure_chunks_async(
+        chunks, source_file=source_file, staged_file=staged_file
+    ))
+
+
+def load_failures_pipeline(df, source_file=None, staged_file=None):
+    """Blocking psycopg 3 pipeline-mode counterpart of load.load_failures"""
+    return asyncio.run(load_failures_async(
+        df, source_file=source_file, staged_file=staged_file
+    ))
@@ -0,0 +1,131 @@
+FACT_TABLE = "fact_service_failure"
+
+
+def month_bounds(date_key):
+    """Return the [start, end) date_key range of the month holding date_key"""
+    year, month = divmod(date_key // 100, 100)
+    start = year * 10000 + month * 100 + 1
+    if month == 12:
+        return start, (year + 1) * 10000 + 101
+    return start, start + 100
+
+
+def partition_name(start_key):
+    """Monthly partition name, e.g. fact_service_failure_y2026m01"""
+    year, month = divmod(start_key // 100, 100)
+    return f"{FACT_TABLE}_y{year:04d}m{month:02d}"
+
+
+def is_partitioned(cur):
+    cur.execute("""
+        SELECT relkind = 'p' FROM pg_class
+        WHERE oid = to_regclass(%s)
+    """, (FACT_TABLE,))
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+EXISTING_PARTITIONS_SQL = """
+    SELECT relname FROM pg_class WHERE relname = ANY(%s)
+"""
+
+# Serializes partition creation between concurrent loads until the
+# creating transaction ends; taken only when a partition is missing
+PARTITION_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext(%s))"
+PARTITION_LOCK_KEY = f"{FACT_TABLE} partitions"
+
+
+def covering_partitions(date_keys):
+    """Monthly partitions covering date_keys, as {name: (start, end)}"""
+    bounds = {month_bounds(int(key)) for key in set(date_keys)}
+    return {partition_name(start): (start, end) for start, end in bounds}
+
+
+def partition_ddl(name, start, end):
+    """Statements creating partition name for [start, end)
+
+    The partition is created standalone and then attached, which does not
+    wait on transactions still writing to the parent table (CREATE TABLE
+    ... PARTITION OF would).
+    """
+    return [
+        f"CREATE TABLE {name} (LIKE {FACT_TABLE} INCLUDING DEFAULTS)",
+        f"""
+            ALTER TABLE {FACT_TABLE} ATTACH PARTITION {name}
+            FOR VALUES FROM ({start}) TO ({end})
+        """,
+    ]
+
+
+def ensure_partitions(cur, date_keys):
+    """Create any missing monthly partitions covering date_keys
+
+    One catalog lookup per call; DDL (partition_ddl) only runs for months
+    that do not exist yet. Before creating any, the partition advisory
+    lock is taken and the catalog checked again, so two loads needing the
+    same new month do not both run CREATE TABLE (the second would fail
+    with "relation already exists"). Returns the names of the partitions
+    created.
+    """
+    names = covering_partitions(date_keys)
+    if not names:
+        return []
+
+    cur.execute(EXISTING_PARTITIONS_SQL, (list(names),))
+    if {row[0] for row in cur.fetchall()} >= set(names):
+        return []
+
+    cur.execute(PARTITION_LOCK_SQL, (PARTITION_LOCK_KEY,))
+    cur.execute(EXISTING_PARTITIONS_SQL, (list(names),))
+    existing = {row[0] for row in cur.fetchall()}
+
+    created = []
+    for name in sorted(set(names) - existing):
+        for statement in partition_ddl(name, *names[name]):
+            cur.execute(statement)
+        created.append(name)
+    return created
+
+
+def partition_fact_table(cur):
+    """Convert an existing fact_service_failure heap to monthly partitions
+
+    Runs inside the caller's transaction: the old table is renamed, a
+    partitioned copy with the same columns is created, partitions for
+    every month present are added, the rows are moved across and the old
+    table is dropped. Returns False if the table was already partitioned.
+    """
+    if is_partitioned(cur):
+        return False
+
+    legacy = f"{FACT_TABLE}_unpartitioned"
+    cur.execute(f"ALTER TABLE {FACT_TABLE} RENAME TO {legacy}")
+    cur.execute(f"""
+        CREATE TABLE {FACT_TABLE} (
+            LIKE {legacy} INCLUDING DEFAULTS,
+            PRIMARY KEY (failure_id, date_key),
+            FOREIGN KEY (asset_key) REFERENCES dim_asset (asset_key),
+            FOREIGN KEY (date_key) REFERENCES dim_date (date_key)
+        ) PARTITION BY RANGE (date_key)
+    """)
+
+    cur.execute(f"SELECT DISTINCT date_key FROM {legacy} WHERE date_key IS NOT NULL")
+    ensure_partitions(cur, [row[0] for row in cur.fetchall()])
+
+    cur.execute(f"INSERT INTO {FACT_TABLE} SELECT * FROM {legacy}")
+
+    # Keep the failure_id sequence alive when the old table is dropped
+    cur.execute("SELECT pg_get_serial_sequence(%s, 'failure_id')", (legacy,))
+    sequence = cur.fetchone()[0]
+    if sequence:
+        cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {FACT_TABLE}.failure_id")
+
+    cur.execute(f"DROP TABLE {legacy}")
+
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_fact_asset ON {FACT_TABLE} (asset_key)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_fact_date ON {FACT_TABLE} (date_key)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_fact_batch ON {FACT_TABLE} (batch_id)")
+    cur.execute(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS idx_fact_row_hash ON {FACT_TABLE} (row_hash, date_key)"
+    )
+    return True
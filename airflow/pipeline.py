@@ -0,0 +1,276 @@
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from extract import CSV_EXTENSIONS, extract_failures, is_compressed, iter_failure_chunks
+from transform import transform_failures
+from quality_checks import apply_quality_rules, log_quality_report
+from load import load_failure_chunks, load_failure_chunks_resumable
+from load_async import load_failure_chunks_pipeline
+from manifest import pending_files, record_failed_files
+from metrics import StageMetrics, frame_mb, record_stage_metrics, write_textfile
+from elt_logger import log_info, log_error
+
+# Rows per chunk in streaming mode; 0 disables streaming
+CHUNK_SIZE = int(os.getenv("ETL_CHUNK_SIZE", 100_000))
+
+# Staged files at least this large are streamed instead of being
+# prepared whole in a pool worker
+STREAM_MIN_BYTES = int(os.getenv("ETL_STREAM_MIN_BYTES", 256 * 1024 * 1024))
+
+# load.LOAD_MODES key, or "pipeline" for the psycopg 3 loader (load_async.py)
+LOAD_MODE = os.getenv("ETL_LOAD_MODE", "copy")
+
+# Commit every chunk with a per-file checkpoint, so a failed load resumes
+# where it stopped (load.load_failure_chunks_resumable)
+RESUMABLE = os.getenv("ETL_RESUMABLE", "false").lower() == "true"
+
+STAGED_EXTENSIONS = (".parquet",) + CSV_EXTENSIONS
+
+# Prepared chunks allowed to wait for the loader. Peak memory is roughly
+# (QUEUE_DEPTH + 2) chunks regardless of file size.
+QUEUE_DEPTH = 2
+
+_DONE = object()
+
+
+def load_chunks(chunks, mode, source_file=None, staged_file=None, resumable=RESUMABLE):
+    """Send chunks to the loader for mode ("pipeline" uses psycopg 3)
+
+    Resumable loads need staged_file, whose hash keys the checkpoint.
+    """
+    if resumable:
+        if staged_file is None:
+            raise ValueError("Resumable loads need a staged_file")
+        return load_failure_chunks_resumable(
+            chunks, staged_file, mode=mode, source_file=source_file
+        )
+    if mode == "pipeline":
+        return load_failure_chunks_pipeline(
+            chunks, source_file=source_file, staged_file=staged_file
+        )
+    return load_failure_chunks(
+        chunks, mode=mode, source_file=source_file, staged_file=staged_file
+    )
+
+
+def _put(out, item, stop):
+    """Block until item is queued or the consumer has gone away"""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def clean_rows(df):
+    """Rows of a checked frame that passed every quality rule"""
+    return int(df["failed_rules"].isna().sum())
+
+
+def _produce(path, chunksize, out, stop, metrics):
+    try:
+        chunks = iter(iter_failure_chunks(path, chunksize))
+        while True:
+            with metrics.stage("extract") as stage:
+                chunk = next(chunks, None)
+                stage.rows_out = 0 if chunk is None else len(chunk)
+                stage.frame_mb = None if chunk is None else frame_mb(chunk)
+            if chunk is None:
+                break
+            with metrics.stage("transform", rows_in=len(chunk)) as stage:
+                chunk = transform_failures(chunk)
+                stage.rows_out = len(chunk)
+                stage.frame_mb = frame_mb(chunk)
+            with metrics.stage("checks", rows_in=len(chunk)) as stage:
+                chunk, report = apply_quality_rules(chunk)
+                stage.rows_out = clean_rows(chunk)
+                stage.frame_mb = frame_mb(chunk)
+            log_quality_report(report, path)
+            if not _put(out, chunk, stop):
+                return
+    except Exception as e:
+        _put(out, e, stop)
+        return
+    _put(out, _DONE, stop)
+
+
+def prepared_chunks(path, chunksize=CHUNK_SIZE, depth=QUEUE_DEPTH, metrics=None):
+    """Yield transformed, quality-checked chunks of the file at path
+
+    Extract, transform and checks run on a background thread and stay up
+    to `depth` chunks ahead of the caller, so reading chunk N+1 overlaps
+    with loading chunk N. Their timings are added to metrics (a
+    StageMetrics), complete once the generator is exhausted.
+    """
+    if metrics is None:
+        metrics = StageMetrics()
+    out = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=_produce,
+        args=(path, chunksize, out, stop, metrics),
+        name="etl-extract",
+        daemon=True,
+    )
+    producer.start()
+
+    try:
+        while True:
+            item = out.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+def run_streaming_etl(path, chunksize=CHUNK_SIZE, mode=LOAD_MODE, staged_file=None,
+                      metrics=None):
+    """Extract, transform, check and load path one chunk at a time
+
+    The load stage's wall time includes waiting for the next chunk, since
+    the stages overlap.
+    """
+    if metrics is None:
+        metrics = StageMetrics()
+    log_info("Streaming %s in chunks of %s rows", path, chunksize)
+    with metrics.stage("load") as stage:
+        result = load_chunks(
+            prepared_chunks(path, chunksize, metrics=metrics), mode, source_file=path,
+            staged_file=staged_file,
+        )
+        stage.rows_in = result.records_loaded + result.records_quarantined
+        stage.rows_out = result.records_loaded
+    return result
+
+
+def find_staged_files(staging_dir):
+    """Return every staged Parquet/CSV file in staging_dir, sorted by name"""
+    if not os.path.isdir(staging_dir):
+        return []
+    return [
+        os.path.join(staging_dir, name)
+        for name in sorted(os.listdir(staging_dir))
+        if name.endswith(STAGED_EXTENSIONS)
+    ]
+
+
+def prepare_file(path):
+    """Extract, transform and check one file (runs in a pool worker)
+
+    Returns (df, StageMetrics for the three stages).
+    """
+    metrics = StageMetrics()
+    with metrics.stage("extract") as stage:
+        df = extract_failures(path)
+        stage.rows_out = len(df)
+        stage.frame_mb = frame_mb(df)
+    with metrics.stage("transform", rows_in=len(df)) as stage:
+        df = transform_failures(df)
+        stage.rows_out = len(df)
+        stage.frame_mb = frame_mb(df)
+    with metrics.stage("checks", rows_in=len(df)) as stage:
+        df, report = apply_quality_rules(df)
+        stage.rows_out = clean_rows(df)
+        stage.frame_mb = frame_mb(df)
+    log_quality_report(report, path)
+    return df, metrics
+
+
+def run_parallel_etl(paths, mode=LOAD_MODE, workers=None):
+    """Prepare files in a process pool and load each one as it completes
+
+    Entry point for loads outside Airflow; the DAG runs the same stages
+    as separate tasks through artifacts.py.
+
+    Extract and transform run one file per worker (one worker per core by
+    default); loading stays in this process, one transaction and one
+    etl_metadata row per file. Files whose content is already in the
+    manifest are skipped. Files of STREAM_MIN_BYTES or more, compressed
+    files (whose size says little about their row count) and every file
+    when RESUMABLE are streamed afterwards instead of being prepared
+    whole. Every file is attempted;
+    if any fail, a RuntimeError naming them is raised at the end.
+    Stage metrics go to etl_stage_metrics per file and, summed over the
+    run, to the "etl" Prometheus textfile. Returns a load.LoadResult per
+    loaded file.
+    """
+    staged = pending_files(paths)
+    if not staged:
+        log_info("All staged files are already loaded")
+        return []
+
+    streamed = [
+        staged_file for staged_file in staged
+        if CHUNK_SIZE > 0 and (
+            RESUMABLE
+            or staged_file.file_size >= STREAM_MIN_BYTES
+            or is_compressed(staged_file.path)
+        )
+    ]
+    pooled = [staged_file for staged_file in staged if staged_file not in streamed]
+
+    results = []
+    failed = []
+    run_metrics = StageMetrics()
+
+    def loaded(result, metrics):
+        results.append(result)
+        record_stage_metrics(metrics, run_id=result.batch_id)
+        run_metrics.merge(metrics)
+
+    if pooled:
+        workers = workers or min(len(pooled), os.cpu_count() or 1)
+        log_info("Preparing %s files with %s workers", len(pooled), workers)
+
+        # spawn avoids forking the Airflow task runner's threads and locks
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = {
+                pool.submit(prepare_file, staged_file.path): staged_file
+                for staged_file in pooled
+            }
+            for future in as_completed(futures):
+                staged_file = futures.pop(future)
+                try:
+                    df, metrics = future.result()
+                    with metrics.stage("load", rows_in=len(df)) as stage:
+                        result = load_chunks([df], mode, staged_file=staged_file)
+                        stage.rows_out = result.records_loaded
+                    loaded(result, metrics)
+                except Exception as e:
+                    log_error("File %s failed: %s", staged_file.path, e)
+                    failed.append(staged_file)
+
+    for staged_file in streamed:
+        try:
+            metrics = StageMetrics()
+            result = run_streaming_etl(
+                staged_file.path, mode=mode, staged_file=staged_file, metrics=metrics
+            )
+            loaded(result, metrics)
+        except Exception as e:
+            log_error("File %s failed: %s", staged_file.path, e)
+            failed.append(staged_file)
+
+    if run_metrics.stages:
+        log_info("Stage totals: %s", run_metrics.summary())
+        write_textfile(run_metrics, "etl")
+
+    if failed:
+        record_failed_files(failed)
+        names = ", ".join(staged_file.path for staged_file in failed)
+        raise RuntimeError(f"{len(failed)} of {len(staged)} staged files failed: {names}")
+
+    records_loaded = sum(result.records_loaded for result in results)
+    log_info("Loaded %s records from %s files", records_loaded, len(staged))
+    return results
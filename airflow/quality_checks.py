@@ -1,5 +1,78 @@
+import os
+
+import pandas as pd
+
+from elt_logger import log_warning
+
+# Longest plausible outage; anything above is treated as a data error
+MAX_OUTAGE_MINUTES = float(os.getenv("ETL_MAX_OUTAGE_MINUTES", 60 * 24 * 30))
+
+# Comma-separated whitelist; when unset failure_type only has to be present
+ALLOWED_FAILURE_TYPES = [
+    value.strip()
+    for value in os.getenv("ETL_ALLOWED_FAILURE_TYPES", "").split(",")
+    if value.strip()
+]
+
 def check_null_asset(df):
     return df["asset_id"].isnull().sum()
 
 def check_negative_outage(df):
     return (df["outage_minutes"] < 0).sum()
+
+# Rule builders: each returns a function mapping a frame to a boolean
+# Series that is True where the row VIOLATES the rule
+
+def not_null(column):
+    return lambda df: df[column].isnull()
+
+def in_range(column, low, high):
+    return lambda df: df[column].notna() & ~df[column].between(low, high)
+
+def allowed_values(column, values):
+    return lambda df: ~df[column].isin(values)
+
+def not_before(column, other):
+    return lambda df: df[column] < df[other]
+
+QUALITY_RULES = {
+    "null_asset_id": not_null("asset_id"),
+    "null_start_time": not_null("start_time"),
+    "null_end_time": not_null("end_time"),
+    "end_before_start": not_before("end_time", "start_time"),
+    "outage_out_of_range": in_range("outage_minutes", 0, MAX_OUTAGE_MINUTES),
+    "invalid_failure_type": (
+        allowed_values("failure_type", ALLOWED_FAILURE_TYPES)
+        if ALLOWED_FAILURE_TYPES else not_null("failure_type")
+    ),
+    # extract.to_boolean maps missing and unrecognized values to NA
+    "invalid_resolved": not_null("resolved"),
+}
+
+def apply_quality_rules(df, rules=QUALITY_RULES):
+    """Evaluate every rule over df in one vectorized pass
+
+    Returns (df, report): df gains a failed_rules column holding the
+    comma-separated names of the rules each row broke (categorical, NaN
+    for clean rows), and report maps every rule name to its violation count.
+    """
+    # Arrow-backed comparisons are NA where a value is missing; a missing
+    # value is the null rules' business, not a violation of this one
+    violations = pd.DataFrame(
+        {name: rule(df) for name, rule in rules.items()}, index=df.index
+    ).fillna(False).astype(bool)
+    report = violations.sum().astype(int).to_dict()
+
+    labels = pd.Series([f"{name}," for name in rules], index=violations.columns, dtype=object)
+    failed_rules = violations.dot(labels).str.rstrip(",")
+    # Few distinct combinations, so categorical like the other labels
+    failed_rules = failed_rules.where(failed_rules != "", None).astype("category")
+    df = df.assign(failed_rules=failed_rules)
+    return df, report
+
+def log_quality_report(report, source):
+    """Log the non-zero entries of an apply_quality_rules report"""
+    broken = {name: count for name, count in report.items() if count}
+    if broken:
+        summary = ", ".join(f"{name}={count}" for name, count in broken.items())
+        log_warning("Quality rule violations in %s: %s", source, summary)
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+"""
+Pipeline throughput benchmark
+
+Generates a synthetic failures.csv, runs it through extract, transform,
+quality checks and load against a local PostgreSQL, and writes the
+per-stage timings, rows/sec and peak RSS to a JSON file.
+
+    python benchmark.py --rows 1000000 --assets 5000 --mode copy
+    python benchmark.py --rows 1000000 --engine arrow
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Add etl directory to path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'etl'))
+
+from db import connection_params
+from extract import ENGINE, ENGINES, extract_failures, iter_failure_chunks
+from transform import transform_failures
+from quality_checks import apply_quality_rules
+from load import load_failure_chunks
+from metrics import frame_mb, peak_rss_mb
+from pipeline import CHUNK_SIZE
+
+FAILURE_TYPES = [
+    "Transformer Fault", "Pipe Burst", "Pump Failure", "Line Down",
+    "Valve Leak", "Meter Fault", "Substation Trip", "Main Break",
+    "Sensor Drift", "Breaker Trip", "Cable Fault", "Pressure Drop",
+]
+
+# Hosts the benchmark may write to without --allow-remote
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", "postgres"}
+
+# Rows generated and written per slice, so 10M-row files fit in memory
+GENERATE_SLICE_ROWS = 1_000_000
+
+
+def _bad_rows(rng, df, count):
+    """Damage count random rows, one kind of defect each"""
+    if count == 0:
+        return df
+    rows = rng.choice(len(df), size=count, replace=False)
+    kinds = rng.integers(0, 4, size=count)
+    columns = {name: df.columns.get_loc(name) for name in df.columns}
+
+    df.iloc[rows[kinds == 0], columns["asset_id"]] = None
+    df.iloc[rows[kinds == 1], columns["start_time"]] = "not a timestamp"
+    df.iloc[rows[kinds == 2], columns["failure_type"]] = None
+    # end_time before start_time
+    swapped = rows[kinds == 3]
+    df.iloc[swapped, columns["end_time"]] = "2020-01-01 00:00:00"
+    return df
+
+
+def generate_failures(path, rows, assets=1000, failure_types=6,
+                      duplicate_rate=0.01, bad_rate=0.005, seed=42):
+    """Write a raw failures.csv of about `rows` rows to path
+
+    Asset ids are drawn with a skew (a few assets fail a lot), outages
+    are log-normal, and duplicate_rate / bad_rate of the rows are exact
+    duplicates or broken in a way the quality rules catch.
+    """
+    rng = np.random.default_rng(seed)
+    types = FAILURE_TYPES[:failure_types]
+    asset_weights = rng.zipf(1.5, size=assets).astype(float)
+    asset_weights /= asset_weights.sum()
+    epoch = pd.Timestamp("2026-01-01")
+
+    written = 0
+    with open(path, "w", newline="") as f:
+        while written < rows:
+            size = min(GENERATE_SLICE_ROWS, rows - written)
+            unique = size - int(size * duplicate_rate)
+
+            start = epoch + pd.to_timedelta(rng.integers(0, 365 * 86400, unique), unit="s")
+            outage = np.clip(rng.lognormal(4.5, 1.0, unique), 1, 60 * 24 * 7).astype(int)
+            df = pd.DataFrame({
+                "asset_id": [f"A{i:06d}" for i in rng.choice(assets, unique, p=asset_weights)],
+                "start_time": start.strftime("%Y-%m-%d %H:%M:%S"),
+                "end_time": (start + pd.to_timedelta(outage, unit="m")).strftime("%Y-%m-%d %H:%M:%S"),
+                "failure_type": rng.choice(types, unique),
+                "resolved": rng.random(unique) < 0.85,
+            }).astype(object)
+
+            df = _bad_rows(rng, df, int(unique * bad_rate))
+            if size > unique:
+                df = pd.concat([df, df.sample(size - unique, random_state=seed + written)])
+                df = df.sample(frac=1, random_state=seed + written)
+
+            df.to_csv(f, index=False, header=written == 0)
+            written += size
+    return written
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(path, mode="copy", chunksize=CHUNK_SIZE, load=True, engine=ENGINE):
+    """Time each stage over path; returns {stage: {seconds, rows, rows_per_sec, frame_mb}}
+
+    Chunks are extracted, transformed and checked one at a time and
+    handed to load.load_failure_chunks, so the load time is the wall time
+    of the whole run minus the time spent preparing chunks. frame_mb is
+    the largest frame (chunk) a stage produced.
+    """
+    seconds = {"extract": 0.0, "transform": 0.0, "checks": 0.0}
+    rows = {"extract": 0, "transform": 0, "checks": 0}
+    frames = {"extract": 0.0, "transform": 0.0, "checks": 0.0}
+
+    def timed_chunks():
+        if chunksize:
+            chunks = iter(iter_failure_chunks(path, chunksize, engine=engine))
+        else:
+            chunks = (extract_failures(p, engine=engine) for p in [path])
+        while True:
+            started = time.perf_counter()
+            chunk = next(chunks, None)
+            seconds["extract"] += time.perf_counter() - started
+            if chunk is None:
+                return
+            rows["extract"] += len(chunk)
+            frames["extract"] = max(frames["extract"], frame_mb(chunk))
+
+            started = time.perf_counter()
+            chunk = transform_failures(chunk)
+            seconds["transform"] += time.perf_counter() - started
+            rows["transform"] += len(chunk)
+            frames["transform"] = max(frames["transform"], frame_mb(chunk))
+
+            started = time.perf_counter()
+            chunk, _ = apply_quality_rules(chunk)
+            seconds["checks"] += time.perf_counter() - started
+            rows["checks"] += len(chunk)
+            frames["checks"] = max(frames["checks"], frame_mb(chunk))
+            yield chunk
+
+    started = time.perf_counter()
+    if load:
+        result = load_failure_chunks(timed_chunks(), mode=mode, source_file=path)
+        seconds["load"] = time.perf_counter() - started - sum(seconds.values())
+        rows["load"] = result.records_loaded
+    else:
+        for _ in timed_chunks():
+            pass
+    total = time.perf_counter() - started
+
+    stages = {
+        stage: {
+            "seconds": round(seconds[stage], 3),
+            "rows": rows[stage],
+            "rows_per_sec": round(rows[stage] / seconds[stage]) if seconds[stage] else None,
+            "frame_mb": round(frames[stage], 1) if stage in frames else None,
+        }
+        for stage in seconds
+    }
+    stages["total"] = {
+        "seconds": round(total, 3),
+        "rows": rows["extract"],
+        "rows_per_sec": round(rows["extract"] / total) if total else None,
+        "frame_mb": None,
+    }
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the InfraPulse ETL stages")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows to generate (10k-10M)")
+    parser.add_argument("--assets", type=int, default=1000, help="distinct asset ids")
+    parser.add_argument("--failure-types", type=int, default=6,
+                        help=f"distinct failure types (max {len(FAILURE_TYPES)})")
+    parser.add_argument("--duplicate-rate", type=float, default=0.01, help="share of exact duplicate rows")
+    parser.add_argument("--bad-rate", type=float, default=0.005, help="share of rows failing a quality rule")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--input", help="benchmark an existing CSV/Parquet file instead of generating one")
+    parser.add_argument("--data-dir", default="data/benchmark", help="where generated files are written")
+    parser.add_argument("--mode", default="copy", help="load.LOAD_MODES key")
+    parser.add_argument("--engine", default=ENGINE, choices=ENGINES,
+                        help="extract/transform engine (default: ETL_ENGINE or pandas)")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="rows per chunk (0 = whole file)")
+    parser.add_argument("--no-load", action="store_true", help="skip the database stage")
+    parser.add_argument("--allow-remote", action="store_true",
+                        help="allow loading into a non-local POSTGRES_HOST")
+    parser.add_argument("--output", help="results file (default: benchmarks/<timestamp>.json)")
+    args = parser.parse_args()
+
+    host = connection_params()["host"]
+    is_local = host in LOCAL_HOSTS or host.startswith("/")
+    if not args.no_load and not is_local and not args.allow_remote:
+        parser.error(f"POSTGRES_HOST={host} is not local; pass --allow-remote to load into it")
+    if not 1 <= args.failure_types <= len(FAILURE_TYPES):
+        parser.error(f"--failure-types must be between 1 and {len(FAILURE_TYPES)}")
+
+    path = args.input
+    generate_seconds = None
+    if path is None:
+        os.makedirs(args.data_dir, exist_ok=True)
+        path = os.path.join(args.data_dir, f"failures_{args.rows}.csv")
+        print(f"⏳ Generating {args.rows} rows -> {path}")
+        started = time.perf_counter()
+        generate_failures(
+            path, args.rows, assets=args.assets, failure_types=args.failure_types,
+            duplicate_rate=args.duplicate_rate, bad_rate=args.bad_rate, seed=args.seed,
+        )
+        generate_seconds = round(time.perf_counter() - started, 3)
+
+    print(f"⏱️  Running extract / transform / checks{'' if args.no_load else ' / load'} "
+          f"on {path} ({args.engine} engine)")
+    stages = run_benchmark(
+        path, mode=args.mode, chunksize=args.chunksize, load=not args.no_load, engine=args.engine,
+    )
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "cpu_count": os.cpu_count(),
+        "input": path,
+        "input_bytes": os.path.getsize(path),
+        "params": {
+            "rows": args.rows if args.input is None else None,
+            "assets": args.assets,
+            "failure_types": args.failure_types,
+            "duplicate_rate": args.duplicate_rate,
+            "bad_rate": args.bad_rate,
+            "seed": args.seed,
+            "mode": None if args.no_load else args.mode,
+            "chunksize": args.chunksize,
+            "engine": args.engine,
+        },
+        "generate_seconds": generate_seconds,
+        "stages": stages,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs("benchmarks", exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join("benchmarks", f"{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print("\n" + "=" * 60)
+    for stage, stats in stages.items():
+        rate = f"{stats['rows_per_sec']:,} rows/s" if stats["rows_per_sec"] else "-"
+        frame = f"  {stats['frame_mb']:,.1f} MB frame" if stats["frame_mb"] is not None else ""
+        print(f"  {stage:<10} {stats['seconds']:>9.3f}s  {stats['rows']:>10,} rows  {rate}{frame}")
+    print(f"  peak RSS   {results['peak_rss_mb']:.1f} MB")
+    print("=" * 60)
+    print(f"✅ Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+row_hash stability check
+
+row_hash is persisted in fact_service_failure and used to skip rows that
+are already loaded, so a change to its value makes every re-delivered row
+load twice. This hashes a fixed set of rows with the pandas engine, the
+arrow engine and from staged Parquet, and compares the result with the
+values pinned below.
+
+    python check_row_hash.py
+"""
+
+import os
+import sys
+import tempfile
+
+# Add etl directory to path so imports work correctly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'etl'))
+
+from extract import ENGINES, extract_failures
+from staging import convert_to_parquet
+from transform import transform_failures
+
+# Covers repeated and non-ASCII text, a missing asset_id / end_time /
+# resolved, and timestamps given in UTC, with "Z" and with an offset
+ROWS = """\
+asset_id,start_time,end_time,failure_type,resolved
+A000061,2026-10-14 05:13:43,2026-10-14 05:58:43,Transformer Fault,True
+A000061,2026-03-07 23:58:52,2026-03-08 00:51:52,Pipe Burst,True
+,2026-01-01T00:00:00Z,,Pump Failure,
+Pümp-7,2026-06-30 23:30:00+02:00,2026-07-01 00:15:00+02:00,Line Down,False
+"""
+
+EXPECTED_ROW_HASHES = [
+    8696631879130191411,
+    -214838069620601162,
+    7018533166788520451,
+    -9027534995108547233,
+]
+
+
+def check(name, path, engine):
+    df = transform_failures(extract_failures(path, engine=engine))
+    row_hashes = df["row_hash"].tolist()
+    ok = row_hashes == EXPECTED_ROW_HASHES
+    print(f"{'✅' if ok else '❌'} {name}: {row_hashes}")
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "failures.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write(ROWS)
+
+        results = [check(f"{engine} CSV", csv_path, engine) for engine in ENGINES]
+        parquet_path = convert_to_parquet(csv_path)
+        results += [check(f"{engine} Parquet", parquet_path, engine) for engine in ENGINES]
+
+    if not all(results):
+        print(f"Expected: {EXPECTED_ROW_HASHES}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from extract import ENGINE, arrow_frame, extract_failures, iter_failure_chunks
+from transform import transform_failures
+from quality_checks import apply_quality_rules, log_quality_report
+from manifest import StagedFile, loaded_hashes, record_failed_files
+from metrics import StageMetrics, frame_mb, record_stage_metrics, write_textfile
+from pipeline import CHUNK_SIZE, LOAD_MODE, clean_rows, load_chunks
+from db import connection
+from schema import ensure_schema
+from elt_logger import log_info, log_error
+
+# Hand-off between the extract / transform / validate / load tasks. Each
+# task reads the previous stage's Parquet artifact of every staged file
+# and writes its own under <data dir>/artifacts/<run id>/<stage>/, named
+# by the file's content hash. Artifacts are renamed into place only when
+# complete, and existing ones are kept, so a retried task redoes just
+# the files it had not finished and never an earlier stage.
+
+ARTIFACT_COMPRESSION = "zstd"
+
+STAGES = ("extract", "transform", "validate")
+
+FILES_MANIFEST = "files.json"
+
+# Run directories untouched for this long are taken to be abandoned (a
+# run that failed and was never retried) and removed by sweep_artifacts
+ARTIFACT_RETENTION_HOURS = float(os.getenv("ETL_ARTIFACT_RETENTION_HOURS", 72))
+
+
+def run_dir(base_dir, run_id):
+    """Artifact directory of one DAG run"""
+    safe_run_id = re.sub(r"[^A-Za-z0-9_.-]", "_", run_id or "manual")
+    return os.path.join(base_dir, "artifacts", safe_run_id)
+
+
+def _last_modified(directory):
+    latest = os.path.getmtime(directory)
+    for root, _, names in os.walk(directory):
+        for name in names:
+            latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+    return latest
+
+
+def sweep_artifacts(base_dir, keep=None, max_age_hours=ARTIFACT_RETENTION_HOURS):
+    """Remove run directories untouched for max_age_hours; returns them
+
+    keep (the current run's directory) is never removed. Directories that
+    change while being checked are left for the next sweep.
+    """
+    root = os.path.join(base_dir, "artifacts")
+    if not os.path.isdir(root):
+        return []
+
+    cutoff = time.time() - max_age_hours * 3600
+    removed = []
+    for name in sorted(os.listdir(root)):
+        directory = os.path.join(root, name)
+        if directory == keep or not os.path.isdir(directory):
+            continue
+        try:
+            if _last_modified(directory) >= cutoff:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(directory, ignore_errors=True)
+        removed.append(directory)
+
+    if removed:
+        log_info("Removed %s abandoned artifact directories from %s", len(removed), root)
+    return removed
+
+
+def artifact_path(directory, stage, staged_file):
+    return os.path.join(directory, stage, f"{staged_file.file_hash}.parquet")
+
+
+def write_files(directory, staged_files):
+    """Record the staged files this run works on (files.json)"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, FILES_MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump([staged_file._asdict() for staged_file in staged_files], f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def read_files(directory):
+    path = os.path.join(directory, FILES_MANIFEST)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [StagedFile(**entry) for entry in json.load(f)]
+
+
+def iter_artifact(path, chunksize=CHUNK_SIZE, engine=ENGINE):
+    """Yield an artifact as DataFrames of at most chunksize rows (all columns)
+
+    With the arrow engine the frames stay Arrow-backed (extract.arrow_frame).
+    A zero-row artifact yields one empty frame with the artifact's schema,
+    so the next stage still writes its own artifact.
+    """
+    parquet_file = pq.ParquetFile(path)
+    if parquet_file.metadata.num_rows == 0:
+        tables = [parquet_file.schema_arrow.empty_table()]
+    else:
+        tables = (
+            pa.Table.from_batches([batch])
+            for batch in parquet_file.iter_batches(batch_size=chunksize or 1 << 20)
+        )
+    for table in tables:
+        if engine == "arrow":
+            yield arrow_frame(table)
+        else:
+            yield table.to_pandas()
+
+
+def _artifact_type(arrow_type):
+    """Type a column of the first chunk is written as
+
+    All-null columns become strings. Categorical columns get int32 codes,
+    since Arrow sizes them per chunk (int8, int16, ...) and later chunks
+    may need more.
+    """
+    if pa.types.is_null(arrow_type):
+        return pa.string()
+    if pa.types.is_dictionary(arrow_type):
+        return pa.dictionary(pa.int32(), _artifact_type(arrow_type.value_type))
+    return arrow_type
+
+
+def write_artifact(chunks, path):
+    """Stream DataFrames into a Parquet artifact; returns the row count
+
+    The first chunk fixes the schema (see _artifact_type) and later
+    chunks are cast to it. Zero-row input still needs one (empty) chunk
+    to take the schema from.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = pa.schema(
+                    [field.with_type(_artifact_type(field.type)) for field in table.schema],
+                    metadata=table.schema.metadata,
+                )
+                writer = pq.ParquetWriter(tmp_path, schema, compression=ARTIFACT_COMPRESSION)
+            writer.write_table(table.cast(writer.schema))
+            rows += len(chunk)
+        if writer is None:
+            raise ValueError(f"No rows to write to {path}")
+        writer.close()
+    except Exception:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, path)
+    return rows
+
+
+def _extract_file(source, target, staged_path):
+    metrics = StageMetrics()
+
+    def chunks():
+        reader = iter(iter_failure_chunks(source, CHUNK_SIZE))
+        empty = True
+        while True:
+            with metrics.stage("extract") as stage:
+                chunk = next(reader, None)
+                stage.rows_out = 0 if chunk is None else len(chunk)
+                stage.frame_mb = None if chunk is None else frame_mb(chunk)
+            if chunk is None:
+                break
+            empty = False
+            yield chunk
+        if empty:
+            # Header-only file: the whole-file read gives the declared
+            # schema with no rows
+            yield extract_failures(source)
+
+    write_artifact(chunks(), target)
+    return metrics
+
+
+def _transform_file(source, target, staged_path):
+    metrics = StageMetrics()
+
+    def chunks():
+        for chunk in iter_artifact(source):
+            with metrics.stage("transform", rows_in=len(chunk)) as stage:
+                chunk = transform_failures(chunk)
+                stage.rows_out = len(chunk)
+                stage.frame_mb = frame_mb(chunk)
+            yield chunk
+
+    write_artifact(chunks(), target)
+    return metrics
+
+
+def _validate_file(source, target, staged_path):
+    metrics = StageMetrics()
+
+    def chunks():
+        for chunk in iter_artifact(source):
+            with metrics.stage("checks", rows_in=len(chunk)) as stage:
+                chunk, report = apply_quality_rules(chunk)
+                stage.rows_out = clean_rows(chunk)
+                stage.frame_mb = frame_mb(chunk)
+            log_quality_report(report, staged_path)
+            yield chunk
+
+    write_artifact(chunks(), target)
+    return metrics
+
+
+STAGE_STEPS = {
+    "extract": _extract_file,
+    "transform": _transform_file,
+    "validate": _validate_file,
+}
+
+
+def run_stage(directory, stage, workers=None):
+    """Produce the `stage` artifact of every file listed in files.json
+
+    Files run in a spawn process pool, one per worker. Files whose
+    artifact already exists are skipped. As in load_stage, failed files
+    are marked FAILED and a RuntimeError naming them is raised after the
+    others finish; files.json is left as is, so a retry of the task redoes
+    only the missing artifacts.
+    """
+    step = STAGE_STEPS[stage]
+    previous = STAGES[STAGES.index(stage) - 1] if stage != "extract" else None
+
+    todo = []
+    for staged_file in read_files(directory):
+        target = artifact_path(directory, stage, staged_file)
+        if os.path.exists(target):
+            log_info("Skipping %s: %s artifact already written", staged_file.path, stage)
+            continue
+        source = artifact_path(directory, previous, staged_file) if previous else staged_file.path
+        todo.append((staged_file, source, target))
+
+    if not todo:
+        log_info("Nothing to %s", stage)
+        return
+
+    run_metrics = StageMetrics()
+    failed = []
+    workers = workers or min(len(todo), os.cpu_count() or 1)
+    log_info("Running %s on %s files with %s workers", stage, len(todo), workers)
+
+    # spawn avoids forking the Airflow task runner's threads and locks
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = {
+            pool.submit(step, source, target, staged_file.path): staged_file
+            for staged_file, source, target in todo
+        }
+        for future in as_completed(futures):
+            staged_file = futures.pop(future)
+            try:
+                run_metrics.merge(future.result())
+            except Exception as e:
+                log_error("%s of %s failed: %s", stage, staged_file.path, e)
+                failed.append(staged_file)
+
+    record_stage_metrics(run_metrics)
+    write_textfile(run_metrics, stage)
+
+    if failed:
+        record_failed_files(failed)
+        names = ", ".join(staged_file.path for staged_file in failed)
+        raise RuntimeError(f"{stage} failed for {len(failed)} of {len(todo)} files: {names}")
+
+
+def load_stage(directory, mode=LOAD_MODE):
+    """Load every validated artifact; returns the load.LoadResults
+
+    Files the manifest already has as LOADED (e.g. by an earlier attempt
+    of this task) are skipped. Failed files are marked FAILED and a
+    RuntimeError naming them is raised at the end. The run's artifacts
+    are removed once everything is loaded.
+    """
+    staged_files = read_files(directory)
+    if not staged_files:
+        log_info("No files to load")
+        shutil.rmtree(directory, ignore_errors=True)
+        return []
+
+    with connection() as conn:
+        ensure_schema(conn)
+        with conn.cursor() as cur:
+            done = loaded_hashes(cur, [staged_file.file_hash for staged_file in staged_files])
+
+    results = []
+    failed = []
+    run_metrics = StageMetrics()
+    for staged_file in staged_files:
+        if staged_file.file_hash in done:
+            log_info("Skipping %s: already loaded", staged_file.path)
+            continue
+        metrics = StageMetrics()
+        try:
+            with metrics.stage("load") as stage:
+                result = load_chunks(
+                    iter_artifact(artifact_path(directory, "validate", staged_file)),
+                    mode, staged_file=staged_file,
+                )
+                stage.rows_in = result.records_loaded + result.records_quarantined
+                stage.rows_out = result.records_loaded
+        except Exception as e:
+            log_error("File %s failed: %s", staged_file.path, e)
+            failed.append(staged_file)
+            continue
+        results.append(result)
+        record_stage_metrics(metrics, run_id=result.batch_id)
+        run_metrics.merge(metrics)
+
+    write_textfile(run_metrics, "load")
+
+    if failed:
+        record_failed_files(failed)
+        names = ", ".join(staged_file.path for staged_file in failed)
+        raise RuntimeError(f"{len(failed)} of {len(staged_files)} staged files failed: {names}")
+
+    records_loaded = sum(result.records_loaded for result in results)
+    log_info("Loaded %s records from %s files", records_loaded, len(results))
+    shutil.rmtree(directory, ignore_errors=True)
+    return results
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+# Connections checked out longer than this ago are pinged before reuse
+HEALTH_CHECK_IDLE_SECONDS = 30
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_slots = None
+_last_used = {}
+# Pools inherited through fork are kept referenced, never closed: closing
+# them in the child would tear down the parent's TLS sessions
+_inherited_pools = []
+
+
+def connection_params():
+    """Warehouse connection settings from the environment (cloud-ready)"""
+    statement_timeout = int(os.getenv("POSTGRES_STATEMENT_TIMEOUT_MS", 600_000))
+    return {
+        "host": os.getenv("POSTGRES_HOST", "postgres"),
+        "port": int(os.getenv("POSTGRES_PORT", 5432)),
+        "database": os.getenv("POSTGRES_DB", "railway"),
+        "user": os.getenv("POSTGRES_USER"),
+        "password": os.getenv("POSTGRES_PASSWORD"),
+        "sslmode": os.getenv("POSTGRES_SSL_MODE", "require"),  # Required for Railway
+        "connect_timeout": int(os.getenv("POSTGRES_CONNECT_TIMEOUT", 10)),
+        "application_name": "infrapulse_etl",
+        # Detect dead links to the remote database instead of hanging
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 5,
+        "options": f"-c statement_timeout={statement_timeout}",
+    }
+
+
+def libpq_params():
+    """connection_params() keyed by libpq names, for psycopg 3 connect()"""
+    params = connection_params()
+    params["dbname"] = params.pop("database")
+    return params
+
+
+def max_connections():
+    """Connections one process may have checked out at once"""
+    return int(os.getenv("POSTGRES_POOL_MAX", 4))
+
+
+def _get_pool():
+    global _pool, _pool_pid, _slots
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            if _pool is not None:
+                _inherited_pools.append(_pool)
+            # psycopg2 closes returned connections above minconn, so
+            # POSTGRES_POOL_MIN is the number kept open between checkouts
+            min_connections = int(os.getenv("POSTGRES_POOL_MIN", 1))
+            pool_max = max_connections()
+            _pool = pool.ThreadedConnectionPool(
+                min(min_connections, pool_max), pool_max, **connection_params()
+            )
+            _pool_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(pool_max)
+            _last_used.clear()
+        return _pool
+
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+    if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if time.monotonic() - _last_used.get(id(conn), 0) < HEALTH_CHECK_IDLE_SECONDS:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def get_connection():
+    """Check a healthy connection out of this process's pool
+
+    Blocks while POSTGRES_POOL_MAX connections are already checked out.
+    Hand it back with release_connection().
+    """
+    connection_pool = _get_pool()
+    _slots.acquire()
+    try:
+        while True:
+            conn = connection_pool.getconn()
+            if _is_healthy(conn):
+                return conn
+            _last_used.pop(id(conn), None)
+            connection_pool.putconn(conn, close=True)
+    except Exception:
+        _slots.release()
+        raise
+
+
+def release_connection(conn):
+    """Return conn to the pool, rolling back anything left uncommitted"""
+    connection_pool = _get_pool()
+    broken = bool(conn.closed)
+    if not broken and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+
+    if broken:
+        _last_used.pop(id(conn), None)
+    else:
+        _last_used[id(conn)] = time.monotonic()
+    connection_pool.putconn(conn, close=broken)
+    _slots.release()
+
+
+@contextmanager
+def connection():
+    """with connection() as conn: ... -- pooled get/release"""
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        release_connection(conn)
+
+
+def close_pool():
+    """Close every pooled connection owned by this process"""
+    global _pool
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+        _last_used.clear()
@@ -0,0 +1,142 @@
+import os
+from collections import OrderedDict
+
+import pandas as pd
+
+# Upper bound on cached asset_id -> asset_key pairs per worker process
+ASSET_KEY_CACHE_SIZE = int(os.getenv("ASSET_KEY_CACHE_SIZE", 100_000))
+
+# Upserts every incoming asset_id and returns its key in one round trip.
+# The second branch reads the pre-insert snapshot, so it returns exactly
+# the ids the INSERT skipped as already present.
+UPSERT_ASSETS_SQL = """
+    WITH incoming AS (
+        SELECT DISTINCT unnest(%s::varchar[]) AS asset_id
+    ),
+    inserted AS (
+        INSERT INTO dim_asset (asset_id)
+        SELECT asset_id FROM incoming
+        ON CONFLICT (asset_id) DO NOTHING
+        RETURNING asset_id, asset_key
+    )
+    SELECT asset_id, asset_key, TRUE FROM inserted
+    UNION ALL
+    SELECT d.asset_id, d.asset_key, FALSE
+    FROM dim_asset d
+    JOIN incoming i ON i.asset_id = d.asset_id
+"""
+
+SELECT_ASSETS_SQL = """
+    SELECT asset_id, asset_key FROM dim_asset WHERE asset_id = ANY(%s)
+"""
+
+
+def _map_series(asset_ids, keys):
+    lookup = pd.Series(keys, dtype="int64")
+    return asset_ids.map(lookup).astype("int64")
+
+
+class AssetKeyResolver:
+    """Resolves asset_id -> asset_key with a bounded LRU cache.
+
+    Only ids missing from the cache reach the database, where they are
+    upserted in a single set-based statement. Keys learned inside a
+    transaction are held back until commit() so a rollback never leaves
+    keys for rows that do not exist.
+    """
+
+    def __init__(self, max_size=ASSET_KEY_CACHE_SIZE):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _cached(self, asset_ids):
+        """Split asset_ids into ({asset_id: asset_key} known here, missing ids)"""
+        keys = {}
+        missing = []
+        for asset_id in dict.fromkeys(asset_ids):
+            if asset_id in self._cache:
+                self._cache.move_to_end(asset_id)
+                keys[asset_id] = self._cache[asset_id]
+            elif asset_id in self._pending:
+                keys[asset_id] = self._pending[asset_id]
+            else:
+                missing.append(asset_id)
+        return keys, missing
+
+    def _learn(self, keys, rows):
+        """Record (asset_id, asset_key[, is_new]) rows; returns the new count"""
+        new_assets = 0
+        for asset_id, asset_key, *is_new in rows:
+            keys[asset_id] = asset_key
+            self._pending[asset_id] = asset_key
+            new_assets += bool(is_new and is_new[0])
+        return new_assets
+
+    def resolve(self, cur, asset_ids):
+        """Return ({asset_id: asset_key}, new_asset_count) for asset_ids"""
+        keys, missing = self._cached(asset_ids)
+
+        new_assets = 0
+        if missing:
+            cur.execute(UPSERT_ASSETS_SQL, (missing,))
+            new_assets = self._learn(keys, cur.fetchall())
+
+            # A concurrent load may have inserted some ids after our snapshot
+            unresolved = [asset_id for asset_id in missing if asset_id not in keys]
+            if unresolved:
+                cur.execute(SELECT_ASSETS_SQL, (unresolved,))
+                self._learn(keys, cur.fetchall())
+
+        return keys, new_assets
+
+    async def resolve_async(self, cur, asset_ids):
+        """resolve() for a psycopg 3 AsyncCursor"""
+        keys, missing = self._cached(asset_ids)
+
+        new_assets = 0
+        if missing:
+            await cur.execute(UPSERT_ASSETS_SQL, (missing,))
+            new_assets = self._learn(keys, await cur.fetchall())
+
+            unresolved = [asset_id for asset_id in missing if asset_id not in keys]
+            if unresolved:
+                await cur.execute(SELECT_ASSETS_SQL, (unresolved,))
+                self._learn(keys, await cur.fetchall())
+
+        return keys, new_assets
+
+    def map_keys(self, cur, asset_ids):
+        """Map a Series of asset_ids to an int64 Series of asset_keys"""
+        keys, new_assets = self.resolve(cur, asset_ids.unique().tolist())
+        return _map_series(asset_ids, keys), new_assets
+
+    async def map_keys_async(self, cur, asset_ids):
+        """map_keys() for a psycopg 3 AsyncCursor"""
+        keys, new_assets = await self.resolve_async(cur, asset_ids.unique().tolist())
+        return _map_series(asset_ids, keys), new_assets
+
+    def commit(self):
+        """Publish keys learned in the committed transaction to the cache"""
+        for asset_id, asset_key in self._pending.items():
+            self._cache[asset_id] = asset_key
+            self._cache.move_to_end(asset_id)
+        self._pending.clear()
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def rollback(self):
+        """Forget keys learned in a transaction that was rolled back"""
+        self._pending.clear()
+
+    def clear(self):
+        self._cache.clear()
+        self._pending.clear()
+
+
+# Shared by every load in this worker process, so keys survive across
+# chunks and DAG runs
+asset_key_resolver = AssetKeyResolver()
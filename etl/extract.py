@@ -1,17 +1,225 @@
+import os
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 from elt_logger import log_info, log_error, log_warning
 
-def extract_failures(path):
-    """Extract failure records from CSV file"""
+# Columns transform and load actually use; other columns are not read
+EXTRACT_COLUMNS = ["asset_id", "start_time", "end_time", "failure_type", "resolved"]
+
+# Declared in-memory schema: the repetitive text columns are categorical
+# (dictionary-encoded, one small int code per row instead of a Python
+# string) and resolved is a nullable boolean. Timestamps stay as read;
+# transform parses them.
+CATEGORY_COLUMNS = ["asset_id", "failure_type"]
+
+RESOLVED_VALUES = {"true": True, "t": True, "yes": True, "1": True,
+                   "false": False, "f": False, "no": False, "0": False}
+
+# "pandas" parses with pandas (NumPy and object columns). "arrow" parses
+# with pyarrow's multi-threaded CSV reader and keeps the columns
+# Arrow-backed (pd.ArrowDtype) through transform and into the COPY.
+ENGINES = ("pandas", "arrow")
+ENGINE = os.getenv("ETL_ENGINE", "pandas")
+
+def read_csv_options():
+    """pandas.read_csv keywords that apply the declared schema"""
+    return {
+        "usecols": lambda column: column in EXTRACT_COLUMNS,
+        "dtype": {column: "category" for column in CATEGORY_COLUMNS},
+    }
+
+def to_boolean(values):
+    """Nullable boolean; values that are not a recognizable flag become NA"""
+    if pd.api.types.is_bool_dtype(values.dtype):
+        return values.astype("boolean")
+    flags = values.astype("string").str.strip().str.lower().map(RESOLVED_VALUES)
+    return flags.astype("boolean")
+
+def apply_schema(df):
+    """Cast an extracted frame to the declared schema (idempotent)"""
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype("category")
+    if "resolved" in df.columns:
+        df["resolved"] = to_boolean(df["resolved"])
+    return df
+
+def arrow_csv_options():
+    """pyarrow.csv convert options that apply the declared schema
+
+    Timestamps and resolved are read as text, like pandas does, and
+    parsed by transform / to_boolean_arrow.
+    """
+    column_types = {column: pa.dictionary(pa.int32(), pa.string()) for column in CATEGORY_COLUMNS}
+    for column in ("start_time", "end_time", "resolved"):
+        column_types[column] = pa.string()
+    return pv.ConvertOptions(
+        include_columns=EXTRACT_COLUMNS,
+        column_types=column_types,
+        strings_can_be_null=True,
+    )
+
+def to_boolean_arrow(values):
+    """to_boolean for an Arrow array"""
+    if pa.types.is_boolean(values.type):
+        return values
+    flags = pc.utf8_lower(pc.utf8_trim_whitespace(values.cast(pa.string())))
+    true_flags = pa.array([flag for flag, value in RESOLVED_VALUES.items() if value])
+    false_flags = pa.array([flag for flag, value in RESOLVED_VALUES.items() if not value])
+    return pc.if_else(
+        pc.is_in(flags, value_set=true_flags),
+        True,
+        pc.if_else(pc.is_in(flags, value_set=false_flags), False, pa.scalar(None, pa.bool_())),
+    )
+
+def apply_arrow_schema(table):
+    """apply_schema for an Arrow table"""
+    for column in CATEGORY_COLUMNS + ["resolved"]:
+        index = table.schema.get_field_index(column)
+        if index < 0:
+            continue
+        values = table[column]
+        if column == "resolved":
+            values = to_boolean_arrow(values)
+        elif not pa.types.is_dictionary(values.type):
+            values = pc.dictionary_encode(values.cast(pa.string()))
+        table = table.set_column(index, column, values)
+    return table
+
+def _frame_dtype(arrow_type):
+    # Dictionary columns convert to categoricals (types_mapper: None)
+    if pa.types.is_dictionary(arrow_type):
+        return None
+    return pd.ArrowDtype(arrow_type)
+
+def arrow_frame(table):
+    """DataFrame over an Arrow table's buffers (no Python objects)
+
+    Dictionary columns become categoricals, like the pandas engine's;
+    everything else is pd.ArrowDtype.
+    """
+    return table.to_pandas(types_mapper=_frame_dtype)
+
+def rechunk(batches, chunksize):
+    """Regroup Arrow record batches into tables of exactly chunksize rows
+
+    The CSV reader yields batches by block size, not row count; the last
+    table may be shorter.
+    """
+    pending = []
+    rows = 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunksize)
+            rest = table.slice(chunksize)
+            pending = rest.to_batches()
+            rows = rest.num_rows
+    if rows:
+        yield pa.Table.from_batches(pending)
+
+def check_engine(engine):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown ETL engine {engine!r}; expected one of {', '.join(ENGINES)}")
+
+def read_arrow(path):
+    """Read a staged file with the Arrow engine (all reader threads)"""
+    if is_parquet(path):
+        table = pq.read_table(path, columns=EXTRACT_COLUMNS, read_dictionary=CATEGORY_COLUMNS)
+    else:
+        with open_csv_stream(path) as source:
+            table = pv.read_csv(source, convert_options=arrow_csv_options())
+    return arrow_frame(apply_arrow_schema(table))
+
+def iter_arrow(path, chunksize):
+    """Yield a staged file as Arrow-backed DataFrames of chunksize rows"""
+    if is_parquet(path):
+        parquet_file = pq.ParquetFile(path, read_dictionary=CATEGORY_COLUMNS)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=EXTRACT_COLUMNS):
+            yield arrow_frame(apply_arrow_schema(pa.Table.from_batches([batch])))
+        return
+
+    with open_csv_stream(path) as source:
+        reader = pv.open_csv(source, convert_options=arrow_csv_options())
+        for table in rechunk(reader, chunksize):
+            yield arrow_frame(apply_arrow_schema(table))
+
+def is_parquet(path):
+    return path.endswith(".parquet")
+
+# Compressed exports are decompressed while they are parsed
+COMPRESSED_EXTENSIONS = (".gz", ".zst", ".bz2")
+CSV_EXTENSIONS = (".csv",) + tuple(".csv" + extension for extension in COMPRESSED_EXTENSIONS)
+
+def is_compressed(path):
+    return path.endswith(COMPRESSED_EXTENSIONS)
+
+def open_csv_stream(path):
+    """Binary stream over a CSV file, decompressed as it is read
+
+    The codec is picked from the extension (.gz, .zst, .bz2; plain .csv
+    is read as is) and is pyarrow's, so both engines read every format
+    and never hold or write the whole uncompressed file.
+    """
+    return pa.input_stream(path, compression="detect")
+
+def extract_failures(path, engine=ENGINE):
+    """Extract failure records from a staged CSV or Parquet file"""
+    check_engine(engine)
     try:
-        log_info(f"📂 Reading CSV file: {path}")
-        df = pd.read_csv(path)
-        log_info(f"✅ Extracted {len(df)} records from {path}")
-        log_info(f"📊 Columns: {', '.join(df.columns.tolist())}")
+        if engine == "arrow":
+            log_info("📂 Reading file with the arrow engine: %s", path)
+            df = read_arrow(path)
+        elif is_parquet(path):
+            log_info("📂 Reading Parquet file: %s", path)
+            df = pd.read_parquet(path, columns=EXTRACT_COLUMNS, read_dictionary=CATEGORY_COLUMNS)
+        else:
+            log_info("📂 Reading CSV file: %s", path)
+            with open_csv_stream(path) as source:
+                df = pd.read_csv(source, **read_csv_options())
+        if engine == "pandas":
+            df = apply_schema(df)
+        log_info("✅ Extracted %s records from %s", len(df), path)
+        log_info("📊 Columns: %s", ', '.join(df.columns.tolist()))
         return df
     except FileNotFoundError:
-        log_error(f"❌ File not found: {path}")
+        log_error("❌ File not found: %s", path)
+        raise
+    except Exception as e:
+        log_error("❌ Error reading file: %s", e)
+        raise
+
+def iter_failure_chunks(path, chunksize, engine=ENGINE):
+    """Yield failure records from a staged file in chunks of at most chunksize rows"""
+    check_engine(engine)
+    try:
+        log_info("📂 Streaming file: %s (%s rows per chunk, %s engine)", path, chunksize, engine)
+        total = 0
+        if engine == "arrow":
+            for chunk in iter_arrow(path, chunksize):
+                total += len(chunk)
+                yield chunk
+        elif is_parquet(path):
+            parquet_file = pq.ParquetFile(path, read_dictionary=CATEGORY_COLUMNS)
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=EXTRACT_COLUMNS):
+                total += batch.num_rows
+                yield apply_schema(batch.to_pandas())
+        else:
+            with open_csv_stream(path) as source:
+                with pd.read_csv(source, chunksize=chunksize, **read_csv_options()) as reader:
+                    for chunk in reader:
+                        total += len(chunk)
+                        yield apply_schema(chunk)
+        log_info("✅ Extracted %s records from %s", total, path)
+    except FileNotFoundError:
+        log_error("❌ File not found: %s", path)
         raise
     except Exception as e:
-        log_error(f"❌ Error reading CSV: {str(e)}")
+        log_error("❌ Error reading file: %s", e)
         raise
@@ -0,0 +1,125 @@
+import hashlib
+import os
+from collections import namedtuple
+
+from db import connection
+from schema import ensure_schema
+from elt_logger import log_info
+
+LOADED = "LOADED"
+FAILED = "FAILED"
+
+StagedFile = namedtuple("StagedFile", ["path", "file_hash", "file_size"])
+
+# Progress of a resumable load (load.load_failure_chunks_resumable):
+# rows_committed counts the rows of the chunk stream already committed
+Checkpoint = namedtuple(
+    "Checkpoint", ["batch_id", "rows_committed", "records_loaded", "records_quarantined"]
+)
+
+
+def fingerprint(path):
+    """Return a StagedFile with the SHA-256 of path's content and its size"""
+    with open(path, "rb") as f:
+        file_hash = hashlib.file_digest(f, "sha256").hexdigest()
+    return StagedFile(path, file_hash, os.path.getsize(path))
+
+
+def loaded_hashes(cur, file_hashes):
+    """Return the subset of file_hashes already recorded as LOADED"""
+    cur.execute("""
+        SELECT file_hash FROM etl_file_manifest
+        WHERE file_hash = ANY(%s) AND status = %s
+    """, (list(file_hashes), LOADED))
+    return {row[0] for row in cur.fetchall()}
+
+
+RECORD_FILE_SQL = """
+    INSERT INTO etl_file_manifest (file_hash, file_path, file_size, row_count, status)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (file_hash) DO UPDATE SET
+        file_path = EXCLUDED.file_path,
+        file_size = EXCLUDED.file_size,
+        row_count = EXCLUDED.row_count,
+        status = EXCLUDED.status,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def record_file(cur, staged_file, row_count, status):
+    """Upsert the manifest row for staged_file (call inside the load transaction)"""
+    cur.execute(RECORD_FILE_SQL, (
+        staged_file.file_hash, staged_file.path, staged_file.file_size, row_count, status
+    ))
+
+
+SAVE_CHECKPOINT_SQL = """
+    INSERT INTO etl_load_checkpoint
+    (file_hash, batch_id, rows_committed, records_loaded, records_quarantined)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (file_hash) DO UPDATE SET
+        batch_id = EXCLUDED.batch_id,
+        rows_committed = EXCLUDED.rows_committed,
+        records_loaded = EXCLUDED.records_loaded,
+        records_quarantined = EXCLUDED.records_quarantined,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def load_checkpoint(cur, file_hash):
+    """Return the Checkpoint of an unfinished resumable load, or None"""
+    cur.execute("""
+        SELECT batch_id, rows_committed, records_loaded, records_quarantined
+        FROM etl_load_checkpoint WHERE file_hash = %s
+    """, (file_hash,))
+    row = cur.fetchone()
+    return Checkpoint(*row) if row else None
+
+
+def save_checkpoint(cur, file_hash, checkpoint):
+    """Upsert file_hash's checkpoint (call inside the chunk's transaction)"""
+    cur.execute(SAVE_CHECKPOINT_SQL, (file_hash, *checkpoint))
+
+
+def clear_checkpoint(cur, file_hash):
+    cur.execute("DELETE FROM etl_load_checkpoint WHERE file_hash = %s", (file_hash,))
+
+
+def pending_files(paths):
+    """Fingerprint paths and drop files whose content is already loaded
+
+    Identical files staged twice in the same run are only kept once.
+    """
+    staged = {}
+    for path in paths:
+        staged_file = fingerprint(path)
+        if staged_file.file_hash in staged:
+            log_info("Skipping %s: same content as %s", path, staged[staged_file.file_hash].path)
+            continue
+        staged[staged_file.file_hash] = staged_file
+
+    if not staged:
+        return []
+
+    with connection() as conn:
+        ensure_schema(conn)
+        with conn.cursor() as cur:
+            loaded = loaded_hashes(cur, staged)
+
+    pending = []
+    for file_hash, staged_file in staged.items():
+        if file_hash in loaded:
+            log_info("Skipping %s: already loaded (sha256 %s)", staged_file.path, file_hash[:12])
+        else:
+            pending.append(staged_file)
+    return pending
+
+
+def record_failed_files(staged_files):
+    """Mark staged_files FAILED so the next run picks them up again"""
+    with connection() as conn:
+        ensure_schema(conn)
+        with conn.cursor() as cur:
+            for staged_file in staged_files:
+                record_file(cur, staged_file, None, FAILED)
+        conn.commit()
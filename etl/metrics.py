@@ -0,0 +1,193 @@
+import os
+import resource
+import tempfile
+import time
+from contextlib import contextmanager
+
+from db import connection
+from schema import ensure_schema
+from elt_logger import log_info, log_warning
+
+# Node exporter textfile-collector directory; one .prom file per task
+METRICS_DIR = os.getenv(
+    "ETL_METRICS_DIR",
+    os.path.join(os.getenv("AIRFLOW_DATA_DIR", "/opt/airflow/data"), "metrics"),
+)
+
+PROMETHEUS_PREFIX = "infrapulse_etl_stage"
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (Linux reports KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def frame_mb(df):
+    """Memory held by df's columns, strings included (deep)"""
+    # Plain float: psycopg2 would send a NumPy scalar as its repr
+    return float(df.memory_usage(index=False, deep=True).sum()) / (1024 * 1024)
+
+
+class StageMetric:
+    """Totals for one stage; rows_in / rows_out are set by the caller
+
+    frame_mb, also set by the caller (see frame_mb()), is the size of the
+    largest frame the stage produced: one chunk when streaming.
+    """
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.frame_mb = None
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_mb = 0.0
+
+    @property
+    def rows_per_sec(self):
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        if rows is None or not self.wall_seconds:
+            return None
+        return rows / self.wall_seconds
+
+    def add(self, other):
+        """Fold another measurement of the same stage into this one"""
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.peak_rss_mb = max(self.peak_rss_mb, other.peak_rss_mb)
+        if other.frame_mb is not None:
+            self.frame_mb = max(self.frame_mb or 0.0, other.frame_mb)
+        for attr in ("rows_in", "rows_out"):
+            value = getattr(other, attr)
+            if value is not None:
+                setattr(self, attr, (getattr(self, attr) or 0) + value)
+
+
+class StageMetrics:
+    """Per-stage totals for one file or one task
+
+        metrics = StageMetrics()
+        with metrics.stage("transform", rows_in=len(df)) as stage:
+            df = transform_failures(df)
+            stage.rows_out = len(df)
+            stage.frame_mb = frame_mb(df)
+
+    CPU time is that of the thread running the stage; peak memory is the
+    process high-water mark when the stage ends. Entering the same stage
+    again (e.g. once per chunk) adds to its totals.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        sample = StageMetric(name, rows_in=rows_in)
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield sample
+        finally:
+            sample.wall_seconds = time.perf_counter() - wall_started
+            sample.cpu_seconds = time.thread_time() - cpu_started
+            sample.peak_rss_mb = peak_rss_mb()
+            self.add(sample)
+
+    def add(self, sample):
+        if sample.name not in self.stages:
+            self.stages[sample.name] = StageMetric(sample.name)
+        self.stages[sample.name].add(sample)
+
+    def merge(self, other):
+        """Add every stage of another StageMetrics (e.g. from a pool worker)"""
+        for sample in other.stages.values():
+            self.add(sample)
+        return self
+
+    def summary(self):
+        return ", ".join(
+            f"{metric.name} {metric.wall_seconds:.2f}s"
+            + (f" ({metric.rows_per_sec:,.0f} rows/s)" if metric.rows_per_sec else "")
+            + (f" [{metric.frame_mb:,.1f} MB frame]" if metric.frame_mb is not None else "")
+            for metric in self.stages.values()
+        )
+
+
+def record_stage_metrics(metrics, run_id=None, dag_run_id=None):
+    """Insert one etl_stage_metrics row per stage
+
+    run_id ties file-level stages to their etl_metadata batch; task-level
+    stages such as verify only carry the DAG run id. Failures are logged,
+    not raised: the data they describe is already committed.
+    """
+    if not metrics.stages:
+        return
+    if dag_run_id is None:
+        dag_run_id = os.getenv("AIRFLOW_CTX_DAG_RUN_ID")
+
+    try:
+        with connection() as conn:
+            ensure_schema(conn)
+            with conn.cursor() as cur:
+                for metric in metrics.stages.values():
+                    cur.execute("""
+                        INSERT INTO etl_stage_metrics
+                        (run_id, dag_run_id, stage, wall_seconds, cpu_seconds,
+                         rows_in, rows_out, rows_per_sec, peak_rss_mb, frame_mb)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, (
+                        run_id, dag_run_id, metric.name, metric.wall_seconds, metric.cpu_seconds,
+                        metric.rows_in, metric.rows_out, metric.rows_per_sec, metric.peak_rss_mb,
+                        metric.frame_mb,
+                    ))
+            conn.commit()
+    except Exception as e:
+        log_warning("Could not record stage metrics: %s", e)
+
+
+def _prometheus_lines(metrics):
+    gauges = {
+        "wall_seconds": ("Wall-clock seconds spent in the stage", lambda m: m.wall_seconds),
+        "cpu_seconds": ("CPU seconds spent in the stage", lambda m: m.cpu_seconds),
+        "rows_in": ("Rows entering the stage", lambda m: m.rows_in),
+        "rows_out": ("Rows leaving the stage", lambda m: m.rows_out),
+        "rows_per_second": ("Stage throughput", lambda m: m.rows_per_sec),
+        "peak_rss_bytes": ("Process peak RSS at the end of the stage", lambda m: m.peak_rss_mb * 1024 * 1024),
+        "frame_bytes": (
+            "Largest DataFrame the stage produced",
+            lambda m: None if m.frame_mb is None else m.frame_mb * 1024 * 1024,
+        ),
+        "last_run_timestamp_seconds": ("Unix time the stage metrics were written", lambda m: time.time()),
+    }
+    for suffix, (help_text, value_of) in gauges.items():
+        name = f"{PROMETHEUS_PREFIX}_{suffix}"
+        yield f"# HELP {name} {help_text}"
+        yield f"# TYPE {name} gauge"
+        for metric in metrics.stages.values():
+            value = value_of(metric)
+            if value is not None:
+                yield f'{name}{{stage="{metric.name}"}} {float(value)}'
+
+
+def write_textfile(metrics, task, metrics_dir=METRICS_DIR):
+    """Write metrics as infrapulse_etl_<task>.prom (Prometheus text format)
+
+    The file is replaced atomically so the collector never reads half of
+    it. Failures are logged, not raised: metrics must not fail a load.
+    """
+    if not metrics.stages:
+        return None
+    path = os.path.join(metrics_dir, f"infrapulse_etl_{task}.prom")
+    try:
+        os.makedirs(metrics_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=metrics_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(_prometheus_lines(metrics)) + "\n")
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log_warning("Could not write metrics file %s: %s", path, e)
+        return None
+    log_info("Stage metrics written to %s", path)
+    return path
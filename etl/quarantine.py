@@ -0,0 +1,38 @@
+import io
+
+# Columns kept for a quarantined row, in etl_quarantine order
+QUARANTINE_COLUMNS = [
+    "failed_rules", "asset_id", "start_time", "end_time",
+    "failure_type", "outage_minutes", "resolved",
+]
+
+
+def split_quarantine(df):
+    """Split a checked frame into (clean rows, rows that failed a rule)
+
+    Frames that never went through apply_quality_rules are all clean.
+    """
+    if "failed_rules" not in df.columns:
+        return df, df.iloc[0:0]
+    failed = df["failed_rules"].notna()
+    return df[~failed].drop(columns="failed_rules"), df[failed]
+
+
+def quarantine_rows(df, source_file=None):
+    """Return (COPY statement, CSV text) that add df's rows to etl_quarantine"""
+    rows = df.reindex(columns=QUARANTINE_COLUMNS).assign(source_file=source_file)
+    statement = (
+        f"COPY etl_quarantine ({', '.join(rows.columns)}) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    return statement, rows.to_csv(index=False, header=False)
+
+
+def write_quarantine(cur, df, source_file=None):
+    """COPY rejected rows into etl_quarantine; returns the row count"""
+    if df.empty:
+        return 0
+
+    statement, data = quarantine_rows(df, source_file)
+    cur.copy_expert(statement, io.StringIO(data))
+    return len(df)
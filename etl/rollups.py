@@ -0,0 +1,65 @@
+# Daily and monthly aggregates of fact_service_failure per asset and
+# failure_type, for dashboards. resolution rate = resolved_count /
+# failure_count. The loader folds each batch in with update_rollups();
+# rebuild_rollups() recomputes both tables from every fact.
+
+ROLLUP_TABLES = {
+    "agg_failure_daily": "date_key",
+    "agg_failure_monthly": "date_key / 100",
+}
+
+_MEASURES = """
+    COUNT(*),
+    COALESCE(SUM(outage_minutes), 0),
+    COUNT(*) FILTER (WHERE resolved)
+"""
+
+_UPSERT_SQL = """
+    INSERT INTO {table} (period_key, asset_key, failure_type,
+                         failure_count, outage_minutes, resolved_count)
+    SELECT {period}, asset_key, COALESCE(failure_type, 'unknown'), {measures}
+    FROM fact_service_failure
+    {where}
+    GROUP BY 1, 2, 3
+    -- A fixed upsert order keeps concurrent loads from deadlocking
+    ORDER BY 1, 2, 3
+    ON CONFLICT (period_key, asset_key, failure_type) DO UPDATE SET
+        failure_count = {table}.failure_count + EXCLUDED.failure_count,
+        outage_minutes = {table}.outage_minutes + EXCLUDED.outage_minutes,
+        resolved_count = {table}.resolved_count + EXCLUDED.resolved_count
+"""
+
+UPDATE_ROLLUP_SQL = [
+    _UPSERT_SQL.format(table=table, period=period, measures=_MEASURES, where="WHERE batch_id = %s")
+    for table, period in ROLLUP_TABLES.items()
+]
+
+REBUILD_ROLLUP_SQL = [
+    _UPSERT_SQL.format(table=table, period=period, measures=_MEASURES, where="")
+    for table, period in ROLLUP_TABLES.items()
+]
+
+
+def update_rollups(cur, batch_id):
+    """Add batch_id's facts to both rollups (call inside the load transaction)
+
+    Only the batch's rows are read, through idx_fact_batch.
+    """
+    for statement in UPDATE_ROLLUP_SQL:
+        cur.execute(statement, (batch_id,))
+
+
+def rebuild_rollups(cur):
+    """Recompute both rollups from all of fact_service_failure
+
+    Runs in the caller's transaction; returns {table: row count}.
+    """
+    cur.execute(f"TRUNCATE {', '.join(ROLLUP_TABLES)}")
+    for statement in REBUILD_ROLLUP_SQL:
+        cur.execute(statement)
+
+    counts = {}
+    for table in ROLLUP_TABLES:
+        cur.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cur.fetchone()[0]
+    return counts
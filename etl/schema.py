@@ -0,0 +1,190 @@
+from collections import namedtuple
+
+# One idempotent addition to the warehouse schema. object is what it
+# creates, as ("relation", name) for tables and indexes or ("column",
+# table, column), so ensure_schema can tell from the catalog whether the
+# DDL still has to run.
+Migration = namedtuple("Migration", ["object", "ddl"])
+
+
+def add_column(table, column, definition):
+    return Migration(
+        ("column", table, column),
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}",
+    )
+
+
+def create_table(name, ddl):
+    return Migration(("relation", name), ddl)
+
+
+def create_index(name, on, unique=False):
+    return Migration(
+        ("relation", name),
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {on}",
+    )
+
+
+# Applied once per worker process, in their own short transaction, before
+# the first load. Only the migrations whose object is missing are run.
+SCHEMA_MIGRATIONS = [
+    add_column("etl_metadata", "source_file", "TEXT"),
+    # One row per staged file content, see manifest.py
+    create_table("etl_file_manifest", """
+    CREATE TABLE IF NOT EXISTS etl_file_manifest (
+        file_hash CHAR(64) PRIMARY KEY,
+        file_path TEXT NOT NULL,
+        file_size BIGINT NOT NULL,
+        row_count BIGINT,
+        status VARCHAR(20) NOT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """),
+    # Rows rejected by quality_checks.QUALITY_RULES, see quarantine.py
+    create_table("etl_quarantine", """
+    CREATE TABLE IF NOT EXISTS etl_quarantine (
+        quarantine_id BIGSERIAL PRIMARY KEY,
+        source_file TEXT,
+        failed_rules TEXT NOT NULL,
+        asset_id TEXT,
+        start_time TIMESTAMPTZ,
+        end_time TIMESTAMPTZ,
+        failure_type TEXT,
+        outage_minutes DOUBLE PRECISION,
+        resolved TEXT,
+        quarantined_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """),
+    add_column("etl_metadata", "records_quarantined", "INT"),
+    # Batch tagging so verify_data only scans what a DAG run loaded
+    add_column("etl_metadata", "dag_run_id", "TEXT"),
+    create_index("idx_etl_metadata_dag_run", "etl_metadata (dag_run_id)"),
+    add_column("fact_service_failure", "batch_id", "INT"),
+    create_index("idx_fact_batch", "fact_service_failure (batch_id)"),
+    # Landing table for the "merge" load mode, see load._load_merge. Not
+    # WAL-logged; rows only live for the length of one load transaction.
+    create_table("stg_service_failure", """
+    CREATE UNLOGGED TABLE IF NOT EXISTS stg_service_failure (
+        batch_id INT NOT NULL,
+        asset_id VARCHAR(50) NOT NULL,
+        date_key INT NOT NULL,
+        full_date DATE NOT NULL,
+        failure_type VARCHAR(100),
+        outage_minutes INT,
+        resolved BOOLEAN
+    )
+    """),
+    create_index("idx_stg_batch", "stg_service_failure (batch_id)"),
+    # Dashboard rollups, see rollups.py. period_key is date_key (YYYYMMDD)
+    # for the daily table and YYYYMM for the monthly one.
+    create_table("agg_failure_daily", """
+    CREATE TABLE IF NOT EXISTS agg_failure_daily (
+        period_key INT NOT NULL,
+        asset_key INT NOT NULL,
+        failure_type VARCHAR(100) NOT NULL,
+        failure_count BIGINT NOT NULL,
+        outage_minutes BIGINT NOT NULL,
+        resolved_count BIGINT NOT NULL,
+        PRIMARY KEY (period_key, asset_key, failure_type)
+    )
+    """),
+    create_table("agg_failure_monthly", """
+    CREATE TABLE IF NOT EXISTS agg_failure_monthly (
+        period_key INT NOT NULL,
+        asset_key INT NOT NULL,
+        failure_type VARCHAR(100) NOT NULL,
+        failure_count BIGINT NOT NULL,
+        outage_minutes BIGINT NOT NULL,
+        resolved_count BIGINT NOT NULL,
+        PRIMARY KEY (period_key, asset_key, failure_type)
+    )
+    """),
+    # Per-stage timings of each file (run_id) or task (dag_run_id only),
+    # see metrics.py
+    create_table("etl_stage_metrics", """
+    CREATE TABLE IF NOT EXISTS etl_stage_metrics (
+        metric_id BIGSERIAL PRIMARY KEY,
+        run_id INT REFERENCES etl_metadata (run_id),
+        dag_run_id TEXT,
+        stage VARCHAR(20) NOT NULL,
+        wall_seconds DOUBLE PRECISION NOT NULL,
+        cpu_seconds DOUBLE PRECISION NOT NULL,
+        rows_in BIGINT,
+        rows_out BIGINT,
+        rows_per_sec DOUBLE PRECISION,
+        peak_rss_mb DOUBLE PRECISION,
+        recorded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """),
+    create_index("idx_stage_metrics_run", "etl_stage_metrics (run_id)"),
+    add_column("etl_stage_metrics", "frame_mb", "DOUBLE PRECISION"),
+    # Natural-key fingerprint (transform.make_row_hash); loads skip rows
+    # whose fingerprint is already here. Unique indexes on a partitioned
+    # table must contain the partition key, hence date_key (which is
+    # derived from start_time, part of the fingerprint). Rows loaded
+    # before this have no fingerprint and are never matched.
+    add_column("fact_service_failure", "row_hash", "BIGINT"),
+    create_index("idx_fact_row_hash", "fact_service_failure (row_hash, date_key)", unique=True),
+    add_column("stg_service_failure", "row_hash", "BIGINT"),
+    # Committed progress of unfinished resumable loads, see manifest.py
+    create_table("etl_load_checkpoint", """
+    CREATE TABLE IF NOT EXISTS etl_load_checkpoint (
+        file_hash CHAR(64) PRIMARY KEY,
+        batch_id INT NOT NULL REFERENCES etl_metadata (run_id),
+        rows_committed BIGINT NOT NULL,
+        records_loaded BIGINT NOT NULL,
+        records_quarantined BIGINT NOT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """),
+]
+
+# Which of the relations / columns the migrations create already exist
+EXISTING_OBJECTS_SQL = """
+    SELECT 'relation', name, NULL
+    FROM unnest(%(relations)s::text[]) AS name
+    WHERE to_regclass(name) IS NOT NULL
+    UNION ALL
+    SELECT 'column', c.relname, a.attname
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    WHERE a.attrelid = ANY(
+        SELECT to_regclass(name) FROM unnest(%(tables)s::text[]) AS name
+    )
+      AND a.attnum > 0 AND NOT a.attisdropped
+"""
+
+_schema_ready = False
+
+
+def missing_migrations(cur, migrations=SCHEMA_MIGRATIONS):
+    """The migrations whose table, index or column is not in the catalog
+
+    Reads the catalog only, so it takes no lock on the warehouse tables.
+    """
+    relations = sorted({m.object[1] for m in migrations if m.object[0] == "relation"})
+    tables = sorted({m.object[1] for m in migrations if m.object[0] == "column"})
+    cur.execute(EXISTING_OBJECTS_SQL, {"relations": relations, "tables": tables})
+    existing = set()
+    for kind, name, column in cur.fetchall():
+        existing.add((kind, name) if kind == "relation" else (kind, name, column))
+    return [migration for migration in migrations if migration.object not in existing]
+
+
+def ensure_schema(conn):
+    """Apply the missing SCHEMA_MIGRATIONS on conn and commit
+
+    ALTER TABLE / CREATE INDEX lock the table (and all its partitions)
+    before they check IF NOT EXISTS, so only DDL whose object is missing
+    is sent; an up-to-date warehouse costs one catalog query. No-op after
+    the first call in a process.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+
+    with conn.cursor() as cur:
+        for migration in missing_migrations(cur):
+            cur.execute(migration.ddl)
+    conn.commit()
+    _schema_ready = True
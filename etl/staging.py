@@ -0,0 +1,91 @@
+import os
+
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+
+from extract import CSV_EXTENSIONS, open_csv_stream
+from elt_logger import log_info, log_error
+
+STAGING_COMPRESSION = "zstd"
+
+# Declared up front so every staged file gets the same schema. Timestamps
+# and resolved stay text, as in extract.arrow_csv_options: Arrow's bool
+# and timestamp conversion reject values extract accepts (yes/no, other
+# timestamp formats) and would fail the whole file, so they are typed by
+# extract.apply_schema / transform.parse_timestamps instead.
+FAILURE_COLUMN_TYPES = {
+    column: pa.string()
+    for column in ("asset_id", "failure_type", "resolved", "start_time", "end_time")
+}
+
+
+def staged_parquet_path(csv_path):
+    """Parquet path a staged CSV is converted to"""
+    if csv_path.endswith(".csv"):
+        return csv_path[:-len(".csv")] + ".parquet"
+    return csv_path + ".parquet"
+
+
+def convert_to_parquet(csv_path):
+    """Rewrite a staged CSV as typed, compressed Parquet and remove the CSV
+
+    The CSV is streamed batch by batch into the Parquet writer (gzip, zstd
+    and bzip2 exports are decompressed on the way), so memory use does not
+    grow with file size. Returns the Parquet path.
+
+    failures.csv becomes failures.parquet; compressed exports keep their
+    full name (failures.csv.gz.parquet) so they cannot collide with a plain
+    CSV of the same stem. An existing Parquet file is never overwritten:
+    FileExistsError is raised and the CSV is left in place.
+    """
+    parquet_path = staged_parquet_path(csv_path)
+    if os.path.exists(parquet_path):
+        raise FileExistsError(f"{parquet_path} is already staged")
+    tmp_path = parquet_path + ".tmp"
+
+    source = open_csv_stream(csv_path)
+    try:
+        reader = pv.open_csv(
+            source,
+            # Empty fields are nulls, as with pandas.read_csv, so the quality
+            # rules treat a staged Parquet file like the CSV it came from
+            convert_options=pv.ConvertOptions(
+                column_types=FAILURE_COLUMN_TYPES, strings_can_be_null=True
+            ),
+        )
+        with pq.ParquetWriter(
+            tmp_path, reader.schema, compression=STAGING_COMPRESSION
+        ) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        source.close()
+
+    os.replace(tmp_path, parquet_path)
+    os.remove(csv_path)
+    return parquet_path
+
+
+def convert_staging_dir(staging_dir):
+    """Convert every staged CSV to Parquet; files that fail stay as CSV"""
+    if not os.path.isdir(staging_dir):
+        log_info("No staging directory at %s. Nothing to convert.", staging_dir)
+        return []
+
+    converted = []
+    for name in sorted(os.listdir(staging_dir)):
+        if not name.endswith(CSV_EXTENSIONS):
+            continue
+        csv_path = os.path.join(staging_dir, name)
+        try:
+            converted.append(convert_to_parquet(csv_path))
+            log_info("Staged %s as Parquet", name)
+        except Exception as e:
+            log_error("Could not convert %s to Parquet, keeping CSV: %s", csv_path, e)
+
+    return converted
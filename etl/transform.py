@@ -1,39 +1,196 @@
+import hashlib
+import os
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from elt_logger import log_info, log_error, log_warning
 
+# Format field exports are expected in; anything else falls back to ISO-8601
+TIMESTAMP_FORMAT = os.getenv("ETL_TIMESTAMP_FORMAT", "%Y-%m-%d %H:%M:%S")
+
+def parse_timestamps(values):
+    """Parse values to UTC datetimes using the declared TIMESTAMP_FORMAT
+
+    Already-typed columns (e.g. from Parquet) are only normalized to UTC;
+    naive timestamps are taken to be UTC. Values that match neither the
+    declared format nor ISO-8601 become NaT and are caught by the
+    null_start_time / null_end_time quality rules.
+    """
+    if isinstance(values.dtype, pd.ArrowDtype):
+        return _arrow_series(_parse_arrow(pa.array(values.array)), values.index)
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        return values.dt.tz_convert("UTC")
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        return values.dt.tz_localize("UTC")
+    # As in _parse_arrow, only values the declared format rejects go
+    # through the ISO-8601 fallback
+    parsed = pd.to_datetime(values, format=TIMESTAMP_FORMAT, utc=True, errors="coerce")
+    rejected = parsed.isna() & values.notna()
+    if rejected.any():
+        fallback = pd.to_datetime(values[rejected], format="ISO8601", utc=True, errors="coerce")
+        parsed = parsed.mask(rejected, fallback.dt.as_unit(parsed.dt.unit))
+    return parsed
+
+def _arrow_series(array, index):
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=index)
+
+def _parse_arrow(values):
+    """parse_timestamps for an Arrow array; returns timestamp[us, UTC]
+
+    The declared format is parsed by Arrow; only values it rejects go
+    through the pandas ISO-8601 fallback.
+    """
+    utc = pa.timestamp("us", "UTC")
+    if pa.types.is_timestamp(values.type):
+        # Naive timestamps are taken to be UTC, as in parse_timestamps
+        return pc.cast(values, utc, safe=False)
+    values = values.cast(pa.string())
+    parsed = pc.strptime(values, format=TIMESTAMP_FORMAT, unit="us", error_is_null=True)
+    rejected = pc.and_(pc.is_null(parsed), pc.is_valid(values))
+    if pc.any(rejected).as_py():
+        fallback = pd.to_datetime(
+            values.filter(rejected).to_pandas(), format="ISO8601", utc=True, errors="coerce"
+        )
+        naive = pa.array(fallback.dt.tz_convert(None).dt.as_unit("us"), type=pa.timestamp("us"))
+        parsed = pc.replace_with_mask(parsed, rejected, naive)
+    return parsed.cast(utc)
+
+def make_date_key(timestamps):
+    """YYYYMMDD int32 key from integer year/month/day (no string formatting)
+
+    NaT gets key 0; such rows are quarantined by the quality rules.
+    Arrow-backed timestamps give an Arrow-backed int32 key.
+    """
+    if isinstance(timestamps.dtype, pd.ArrowDtype):
+        values = pa.array(timestamps.array)
+        key = pc.add(
+            pc.add(pc.multiply(pc.year(values), 10000), pc.multiply(pc.month(values), 100)),
+            pc.day(values),
+        )
+        return _arrow_series(key.fill_null(0).cast(pa.int32()), timestamps.index)
+    return (
+        timestamps.dt.year * 10000
+        + timestamps.dt.month * 100
+        + timestamps.dt.day
+    ).fillna(0).astype("int32")
+
+def make_outage_minutes(start, end):
+    """Whole minutes between start and end as nullable Int32
+
+    Truncated toward zero; NA where either timestamp is missing.
+    Arrow-backed timestamps give an Arrow-backed int32 (the duration is
+    computed by Arrow in microseconds).
+    """
+    if isinstance(start.dtype, pd.ArrowDtype):
+        duration = pc.subtract(pa.array(end.array), pa.array(start.array))
+        minutes = pc.divide(duration.cast(pa.int64()), 60_000_000)
+        return _arrow_series(minutes.cast(pa.int32()), start.index)
+    minutes = (end - start).dt.total_seconds() / 60
+    return np.trunc(minutes).astype("Int32")
+
+# Natural key of an incident; the same incident exported twice gets the
+# same row_hash, which fact_service_failure keeps unique
+ROW_KEY_COLUMNS = ["asset_id", "start_time", "end_time", "failure_type"]
+
+# Hash of a missing text value
+NULL_HASH = np.iinfo(np.uint64).max
+
+# Epoch microseconds pandas stores NaT as
+NAT_MICROS = np.iinfo(np.int64).min
+
+def _mix64(values):
+    """SplitMix64 finalizer over a uint64 array (wrapping arithmetic)"""
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+def _hash_text(value):
+    """8-byte BLAKE2b digest of the UTF-8 value, as a little-endian integer"""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+def _hash_column(values):
+    """uint64 hash of each value of one ROW_KEY_COLUMNS column
+
+    Text is hashed one distinct value at a time (category codes), so
+    categorical and Arrow dictionary columns cost one lookup per row.
+    """
+    if isinstance(values.dtype, pd.ArrowDtype) and pa.types.is_timestamp(values.dtype.pyarrow_dtype):
+        micros = pc.cast(pa.array(values.array), pa.timestamp("us", "UTC"), safe=False)
+        return _mix64(micros.cast(pa.int64()).fill_null(NAT_MICROS).to_numpy().view("uint64"))
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        return _mix64(values.dt.as_unit("us").array.asi8.view("uint64"))
+    values = values.astype("category").cat
+    labels = values.categories.astype(str)
+    hashes = np.fromiter(
+        (_hash_text(label) for label in labels), dtype=np.uint64, count=len(labels)
+    )
+    hashes = np.append(hashes, np.uint64(NULL_HASH))
+    # Code -1 (missing) picks the NULL_HASH appended last
+    return hashes[values.codes.to_numpy()]
+
+def make_row_hash(df):
+    """64-bit fingerprint of each row's ROW_KEY_COLUMNS, as signed int64
+
+    The hash is persisted for deduplication, so it is defined here rather
+    than borrowed from a library whose output may change between
+    versions: text values are hashed with BLAKE2b (8-byte digest of their
+    UTF-8 string), timestamps as UTC epoch microseconds through the
+    SplitMix64 finalizer, and the columns combined in ROW_KEY_COLUMNS
+    order with wrapping uint64 arithmetic. The dtype, resolution or
+    engine a file was read with does not change the result.
+    """
+    row_hash = np.zeros(len(df), dtype="uint64")
+    for column in ROW_KEY_COLUMNS:
+        row_hash = row_hash * np.uint64(1_000_003) ^ _hash_column(df[column])
+    return pd.Series(row_hash.view("int64"), index=df.index)
+
 def transform_failures(df):
     """Transform failure data (clean, enrich, prepare for warehouse)"""
     try:
-        log_info(f"🔄 Starting transformation on {len(df)} records")
+        log_info("🔄 Starting transformation on %s records", len(df))
         
         # Remove duplicates
         initial_count = len(df)
         df = df.drop_duplicates()
         duplicates_removed = initial_count - len(df)
         if duplicates_removed > 0:
-            log_warning(f"⚠️ Removed {duplicates_removed} duplicate records")
+            log_warning("⚠️ Removed %s duplicate records", duplicates_removed)
         
         # Parse timestamps
-        df["start_time"] = pd.to_datetime(df["start_time"])
-        df["end_time"] = pd.to_datetime(df["end_time"])
-        log_info(f"✅ Parsed timestamps")
+        df["start_time"] = parse_timestamps(df["start_time"])
+        df["end_time"] = parse_timestamps(df["end_time"])
+        log_info("✅ Parsed timestamps (UTC)")
         
         # Calculate outage duration
-        df["outage_minutes"] = (
-            df["end_time"] - df["start_time"]
-        ).dt.total_seconds() / 60
+        df["outage_minutes"] = make_outage_minutes(df["start_time"], df["end_time"])
         min_outage = df["outage_minutes"].min()
         max_outage = df["outage_minutes"].max()
         avg_outage = df["outage_minutes"].mean()
-        log_info(f"✅ Calculated outage_minutes (min: {min_outage:.0f}, max: {max_outage:.0f}, avg: {avg_outage:.0f})")
+        # NA for an empty or all-invalid chunk, which %.0f cannot format
+        if pd.notna(avg_outage):
+            avg_outage = round(avg_outage)
+        log_info(
+            "✅ Calculated outage_minutes (min: %s, max: %s, avg: %s)",
+            min_outage, max_outage, avg_outage,
+        )
         
         # Create date key
-        df["date_key"] = df["start_time"].dt.strftime("%Y%m%d").astype(int)
-        date_range = f"{df['start_time'].min().date()} to {df['start_time'].max().date()}"
-        log_info(f"✅ Created date key (range: {date_range})")
+        df["date_key"] = make_date_key(df["start_time"])
+        # min/max are NaT (pandas) or NA (arrow) for an empty or all-invalid chunk
+        first, last = df["start_time"].min(), df["start_time"].max()
+        if pd.notna(first):
+            log_info("✅ Created date key (range: %s to %s)", first.date(), last.date())
+        else:
+            log_info("✅ Created date key (range: no valid start_time)")
+
+        # Fingerprint of the natural key, for cross-run deduplication
+        df["row_hash"] = make_row_hash(df)
         
-        log_info(f"✅ Transformation complete: {len(df)} records ready for load")
+        log_info("✅ Transformation complete: %s records ready for load", len(df))
         return df
     except Exception as e:
-        log_error(f"❌ Transformation failed: {str(e)}")
+        log_error("❌ Transformation failed: %s", e)
         raise
@@ -4,24 +4,31 @@ Initialize Railway PostgreSQL Schema
 This script reads warehouse/schema.sql and executes it
 """
 
-import psycopg2
+import argparse
 import os
+import sys
 from dotenv import load_dotenv
 
+# Reuse the ETL schema helpers
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'etl'))
+
+from db import connection_params, get_connection, release_connection
+from schema import ensure_schema
+from partitions import partition_fact_table
+from rollups import rebuild_rollups
+
 # Load environment variables from .env.prod
 load_dotenv('.env.prod')
 
-def init_schema():
-    """Initialize the database schema"""
+def init_schema(partition_facts=False, rebuild=False):
+    """Initialize the database schema
+
+    With partition_facts=True, fact_service_failure is converted to a
+    table range-partitioned by month on date_key (existing rows are moved).
+    With rebuild=True the daily/monthly rollups are recomputed from all facts.
+    """
     
-    config = {
-        "host": os.getenv("POSTGRES_HOST"),
-        "port": int(os.getenv("POSTGRES_PORT", 5432)),
-        "database": os.getenv("POSTGRES_DB"),
-        "user": os.getenv("POSTGRES_USER"),
-        "password": os.getenv("POSTGRES_PASSWORD"),
-        "sslmode": os.getenv("POSTGRES_SSL_MODE", "require"),
-    }
+    config = connection_params()
     
     print("=" * 60)
     print("🚀 Initializing Railway PostgreSQL Schema")
@@ -34,7 +41,7 @@ def init_schema():
         print(f"   Database: {config['database']}")
         
         print("\n⏳ Connecting to Railway...")
-        conn = psycopg2.connect(**config)
+        conn = get_connection()
         cur = conn.cursor()
         
         print("✅ Connected!")
@@ -53,6 +60,24 @@ def init_schema():
         
         print("✅ Schema executed successfully!")
         
+        # Apply the ETL's incremental schema additions
+        ensure_schema(conn)
+        
+        if partition_facts:
+            print("\n🧩 Partitioning fact_service_failure by month (date_key)...")
+            if partition_fact_table(cur):
+                conn.commit()
+                print("✅ fact_service_failure is now range-partitioned")
+            else:
+                print("   ℹ️  fact_service_failure is already partitioned")
+        
+        if rebuild:
+            print("\n📊 Rebuilding rollup tables from fact_service_failure...")
+            counts = rebuild_rollups(cur)
+            conn.commit()
+            for table, count in counts.items():
+                print(f"   ✅ {table}: {count} rows")
+        
         # Verify tables were created
         print("\n📋 Verifying tables...")
         cur.execute("""
@@ -86,7 +111,7 @@ def init_schema():
         print("✅ Schema initialization complete!")
         print("=" * 60)
         
-        conn.close()
+        release_connection(conn)
         return True
         
     except Exception as e:
@@ -94,5 +119,17 @@ def init_schema():
         return False
 
 if __name__ == "__main__":
-    success = init_schema()
+    parser = argparse.ArgumentParser(description="Initialize the InfraPulse warehouse schema")
+    parser.add_argument(
+        "--partition-facts",
+        action="store_true",
+        help="range-partition fact_service_failure by month on date_key",
+    )
+    parser.add_argument(
+        "--rebuild-rollups",
+        action="store_true",
+        help="recompute agg_failure_daily / agg_failure_monthly from all facts",
+    )
+    args = parser.parse_args()
+    success = init_schema(partition_facts=args.partition_facts, rebuild=args.rebuild_rollups)
     exit(0 if success else 1)
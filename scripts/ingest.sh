@@ -3,11 +3,5 @@
 RAW_DIR=/opt/airflow/data/raw/$(date +%F)
 STAGING=/opt/airflow/data/staging
 
-mkdir -p $STAGING
-
-for file in $RAW_DIR/*; do
-  if [[ -s "$file" ]]; then
-    cp "$file" $STAGING
-    echo "Moved $(basename $file) to staging"
-  fi
-done
+# Renames settled files into staging (no copy); see etl/ingest.py
+exec python "$(dirname "$0")/../etl/ingest.py" "$RAW_DIR" "$STAGING"
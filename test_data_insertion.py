@@ -4,31 +4,27 @@ Test Data Insertion and Query
 Demonstrates how to insert and retrieve data from Railway
 """
 
-import psycopg2
 import os
+import sys
 from datetime import datetime
 from dotenv import load_dotenv
 
+# Connections come from the ETL's shared pool
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'etl'))
+
+from db import get_connection, release_connection
+
 load_dotenv('.env.prod')
 
 def insert_test_data():
     """Insert and query test data"""
     
-    config = {
-        "host": os.getenv("POSTGRES_HOST"),
-        "port": int(os.getenv("POSTGRES_PORT", 5432)),
-        "database": os.getenv("POSTGRES_DB"),
-        "user": os.getenv("POSTGRES_USER"),
-        "password": os.getenv("POSTGRES_PASSWORD"),
-        "sslmode": os.getenv("POSTGRES_SSL_MODE", "require"),
-    }
-    
     print("=" * 60)
     print("🧪 Testing Data Insertion & Query")
     print("=" * 60)
     
     try:
-        conn = psycopg2.connect(**config)
+        conn = get_connection()
         cur = conn.cursor()
         
         # Step 1: Insert into dim_asset
@@ -114,7 +110,7 @@ def insert_test_data():
         print("✅ Data insertion and retrieval successful!")
         print("=" * 60)
         
-        conn.close()
+        release_connection(conn)
         return True
         
     except Exception as e:
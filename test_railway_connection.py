@@ -9,6 +9,11 @@ import sys
 import os
 from dotenv import load_dotenv
 
+# Connections come from the ETL's shared pool
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'etl'))
+
+from db import connection_params, get_connection, release_connection
+
 # Load environment variables
 load_dotenv('.env.prod')
 
@@ -16,23 +21,16 @@ def test_connection():
     """Test the Railway database connection"""
     
     # Get connection parameters
-    config = {
-        "host": os.getenv("POSTGRES_HOST"),
-        "port": int(os.getenv("POSTGRES_PORT", 5432)),
-        "database": os.getenv("POSTGRES_DB"),
-        "user": os.getenv("POSTGRES_USER"),
-        "password": os.getenv("POSTGRES_PASSWORD"),
-        "sslmode": os.getenv("POSTGRES_SSL_MODE", "require"),
-    }
+    config = connection_params()
     
-    # Validate that all required variables are set
-    required_vars = ["host", "database", "user", "password"]
-    missing_vars = [var for var in required_vars if not config.get(var)]
+    # Validate that all required variables are set (connection_params() fills in defaults)
+    required_vars = ["POSTGRES_HOST", "POSTGRES_DB", "POSTGRES_USER", "POSTGRES_PASSWORD"]
+    missing_vars = [var for var in required_vars if not os.getenv(var)]
     
     if missing_vars:
         print("❌ Error: Missing required environment variables:")
         for var in missing_vars:
-            print(f"   - POSTGRES_{var.upper()}")
+            print(f"   - {var}")
         print("\n📝 Ensure .env.prod exists with all required variables")
         return False
     
@@ -49,7 +47,7 @@ def test_connection():
         print(f"   SSL Mode: {config['sslmode']}")
         
         print("\n⏳ Connecting to Railway...")
-        conn = psycopg2.connect(**config)
+        conn = get_connection()
         cur = conn.cursor()
         
         print("✅ Connected successfully!")
@@ -128,7 +126,7 @@ def test_connection():
         print("✅ All tests passed! Your Railway database is ready to use.")
         print("=" * 60)
         
-        conn.close()
+        release_connection(conn)
         return True
         
     except psycopg2.OperationalError as e: